@@ -0,0 +1,285 @@
+# Offline load test for the bot's handlers.
+#
+# Runs the real `bot` from main.py against fake_discord's local REST server, feeding it
+# synthetic gateway dispatches (GUILD_CREATE, INTERACTION_CREATE, MESSAGE_REACTION_ADD/REMOVE)
+# through its ConnectionState, and reports throughput, p50/p99 latency, REST calls and
+# 429s per operation for each scenario:
+#   strike-burst   - moderators strike raiders up to the threshold, then confirm every punishment
+#   reaction-storm - /setupreactionroles, then members flood the panel with reaction adds/removes
+#   nuke           - /nuke mode:purge on a channel with recent and >14 day old history
+#
+# Usage: python bench_load.py [--scenario NAME ...] [--window-scale 0.1] [--rate 0] [--routes]
+# main.py's own flags (e.g. --slim-members or --lazy-members) select the member cache profile.
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import timedelta
+
+os.environ['DISCORD_TOKEN'] = ''  # Importing main must never start the bot
+os.environ.setdefault('BOT_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='minebase-load-'), 'bot.db'))
+os.environ.pop('METRICS_PORT', None)
+
+import discord
+import main
+from fake_discord import (FakeDiscord, DispatchTracker, snowflake, user_payload, member_payload, role_payload,
+                          channel_payload, guild_payload, command_interaction, component_interaction,
+                          reaction_payload, percentiles, custom_ids)
+
+EMOJIS = ['🍎', '🍌', '🍇', '🍉', '🍒', '🍍', '🥝']
+
+# A synthetic guild: an owner, moderators, members, one role per panel emoji and three channels
+class World:
+    def __init__(self, fake, member_count, moderator_count=5, history_days=0):
+        self.fake = fake
+        # The guild and its channels predate any history seeded later, like a real server's do;
+        # the nuke ETA and message-count estimates measure from the channel's creation time
+        created = discord.utils.utcnow() - timedelta(days=history_days, hours=1)
+        self.guild_id = snowflake(created)
+        self.roles = [role_payload(self.guild_id, '@everyone', 0)]
+        self.roles += [role_payload(snowflake(created), f'role {emoji}', i + 1) for i, emoji in enumerate(EMOJIS)]
+        self.general = channel_payload(snowflake(created), self.guild_id, 'general', 0)
+        self.logs = channel_payload(snowflake(created), self.guild_id, 'strike-log', 1)
+        self.purge = channel_payload(snowflake(created), self.guild_id, 'spam', 2)
+        self.owner = member_payload(user_payload(snowflake(), 'owner'))
+        self.moderators = [member_payload(user_payload(snowflake(), f'mod_{i}')) for i in range(moderator_count)]
+        self.members = [member_payload(user_payload(snowflake(), f'member_{i:06d}')) for i in range(member_count)]
+        self.guild = guild_payload(self.guild_id, self.owner['user']['id'], self.roles,
+                                   [self.general, self.logs, self.purge],
+                                   [self.owner, *self.moderators, *self.members])
+        fake.add_guild(self.guild)
+
+    def command(self, member, name, options=(), resolved=None, channel=None):
+        payload = command_interaction(self.fake.app_id, self.guild_id, channel or self.general, member, name, options, resolved)
+        self.fake.register_interaction(payload)
+        return payload
+
+    def press(self, member, custom_id, message):
+        payload = component_interaction(self.fake.app_id, self.guild_id, self.general, member, custom_id, message)
+        self.fake.register_interaction(payload)
+        return payload
+
+# Collects one operation type's latencies and the REST traffic it caused
+class Phase:
+    def __init__(self, name, fake):
+        self.name = name
+        self.fake = fake
+        self.latencies = []
+        self.errors = 0
+        fake.reset_counters()
+        self.started = time.perf_counter()
+
+    def finish(self, ops=None, latencies=None):
+        elapsed = time.perf_counter() - self.started
+        latencies = self.latencies if latencies is None else latencies
+        ops = len(latencies) if ops is None else ops
+        p50, p99 = percentiles(latencies)
+        return {'name': self.name, 'ops': ops, 'seconds': elapsed, 'p50': p50, 'p99': p99, 'errors': self.errors,
+                'rest': sum(self.fake.calls.values()), 'throttled': sum(self.fake.throttled.values()),
+                'routes': dict(self.fake.calls)}
+
+# Dispatch every payload, `rate` per second (0 = all at once), and time each until the
+# handlers it started have finished
+async def drive(tracker, phase, event, payloads, rate):
+    state = main.bot._connection
+
+    async def one(payload):
+        started = time.perf_counter()
+        tasks = tracker.dispatch(state, event, payload)
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                phase.errors += 1
+        phase.latencies.append(time.perf_counter() - started)
+
+    runs = []
+    for i, payload in enumerate(payloads):
+        if rate:
+            await asyncio.sleep(max(phase.started + i / rate - time.perf_counter(), 0))
+        runs.append(asyncio.ensure_future(one(payload)))
+    await asyncio.gather(*runs)
+
+async def wait_for_tasks(tasks):
+    while tasks:
+        await asyncio.gather(*list(tasks.values()), return_exceptions=True)
+
+async def strike_burst(world, tracker, options):
+    rng = random.Random(1)
+    threshold = main.get_guild_config(world.guild_id).strike_threshold
+    raiders = world.members[:options.raiders]
+    payloads = []
+    for raider in raiders:
+        user = raider['user']
+        member = {key: value for key, value in raider.items() if key != 'user'}
+        for _ in range(threshold):
+            payloads.append(world.command(rng.choice(world.moderators), 'strike',
+                                          [{'name': 'user', 'type': 6, 'value': user['id']}],
+                                          {'users': {user['id']: user}, 'members': {user['id']: member}}))
+    rng.shuffle(payloads)
+    phase = Phase('strike', world.fake)
+    await drive(tracker, phase, 'INTERACTION_CREATE', payloads, options.rate)
+    results = [phase.finish()]
+
+    # Press Confirm on every confirmation the burst produced, as the moderator who issued it
+    presses = []
+    for payload in payloads:
+        interaction = world.fake.interactions[payload['token']]
+        message = world.fake.messages.get(interaction['message_id'])
+        if message and custom_ids(message):
+            presses.append(world.press(payload['member'], custom_ids(message)[0], message))
+    phase = Phase('confirm strike', world.fake)
+    await drive(tracker, phase, 'INTERACTION_CREATE', presses, options.rate)
+    await wait_for_tasks(main.log_publisher.tasks)  # Batched log embeds
+    results.append(phase.finish())
+    return results
+
+async def reaction_storm(world, tracker, options):
+    options_list, resolved = [], {'roles': {}}
+    for i, (emoji, role) in enumerate(zip(EMOJIS, world.roles[1:]), start=1):
+        options_list += [{'name': f'emoji{i}', 'type': 3, 'value': emoji}, {'name': f'role{i}', 'type': 8, 'value': role['id']}]
+        resolved['roles'][role['id']] = role
+    options_list.append({'name': 'feedback', 'type': 3, 'value': options.feedback})
+    phase = Phase('setupreactionroles', world.fake)
+    known = set(main.reaction_roles)
+    await drive(tracker, phase, 'INTERACTION_CREATE', [world.command(world.owner, 'setupreactionroles', options_list, resolved)], 0)
+    results = [phase.finish()]
+    panels = set(main.reaction_roles) - known
+    if not panels:
+        print('setupreactionroles did not create a panel; skipping the storm.')
+        return results
+    panel = panels.pop()
+
+    rng = random.Random(2)
+    reactors = world.members[:options.reactors]
+    payloads = []
+    for _ in range(options.reactions):
+        member = rng.choice(reactors)
+        payloads.append(reaction_payload(world.guild_id, world.general['id'], panel, member, rng.choice(EMOJIS), add=rng.random() < 0.6))
+    phase = Phase('reaction add/remove', world.fake)
+    dispatched = defaultdict(list)  # Member ID -> dispatch times
+    state = main.bot._connection
+
+    async def storm():
+        for i, payload in enumerate(payloads):
+            if options.rate:
+                await asyncio.sleep(max(phase.started + i / options.rate - time.perf_counter(), 0))
+            dispatched[int(payload['user_id'])].append(time.perf_counter())
+            started = time.perf_counter()
+            tracker_tasks = tracker.dispatch(state, 'MESSAGE_REACTION_ADD' if 'member' in payload else 'MESSAGE_REACTION_REMOVE', payload)
+            await asyncio.gather(*tracker_tasks, return_exceptions=True)
+            phase.latencies.append(time.perf_counter() - started)
+    await storm()
+    await wait_for_tasks(main.role_flush_tasks)
+    results.append(phase.finish())
+
+    # Time from the first reaction of each debounced batch until the member edit landed
+    applied = []
+    for edited_at, _, member_id in world.fake.member_edits:
+        times = dispatched.get(member_id)
+        if times and times[0] <= edited_at:
+            applied.append(edited_at - times[0])
+            dispatched[member_id] = [t for t in times if t > edited_at]
+    result = phase.finish(latencies=applied)
+    result['name'] = 'reaction -> role applied'
+    results.append(result)
+
+    # --feedback digest holds its panel edit for ROLE_DIGEST_SECONDS after the last change,
+    # so time that wait on its own row instead of inside the storm's
+    if main.role_digest_tasks:
+        phase = Phase('feedback digest', world.fake)
+        digests = len(main.role_digest_tasks)
+        await wait_for_tasks(main.role_digest_tasks)
+        results.append(phase.finish(ops=digests, latencies=[]))
+    return results
+
+async def nuke(world, tracker, options):
+    channel_id = int(world.purge['id'])
+    world.fake.seed_history(channel_id, options.history, options.history_days)
+    # The deletion worker starts draining as soon as the purge queues messages, so count them
+    # as they're queued and time the background phase from the first one
+    queued = []  # (perf_counter time, message count) per queue add
+    add = main.deletion_queue.add
+
+    async def counting_add(guild_id, queue_channel_id, message_ids):
+        queued.append((time.perf_counter(), len(message_ids)))
+        await add(guild_id, queue_channel_id, message_ids)
+    main.deletion_queue.add = counting_add
+    try:
+        phase = Phase('nuke (purge)', world.fake)
+        payload = world.command(world.owner, 'nuke', [{'name': 'mode', 'type': 3, 'value': 'purge'}], channel=world.purge)
+        await drive(tracker, phase, 'INTERACTION_CREATE', [payload], 0)
+        results = [phase.finish()]
+    finally:
+        del main.deletion_queue.add
+    phase = Phase('background deletion', world.fake)  # REST calls made during the purge stay in the purge's row
+    if queued:
+        phase.started = queued[0][0]
+    await wait_for_tasks(main.deletion_queue.tasks)
+    results.append(phase.finish(ops=sum(count for _, count in queued), latencies=[]))
+    left = len(world.fake.history.get(channel_id, ()))
+    if left:
+        print(f'nuke left {left} message(s) in the channel.')
+    return results
+
+SCENARIOS = {'strike-burst': strike_burst, 'reaction-storm': reaction_storm, 'nuke': nuke}
+
+def print_results(results, routes):
+    print(f"{'operation':<26} {'ops':>6} {'wall s':>7} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'REST':>6} {'REST/op':>8} {'429s':>5} {'errors':>6}")
+    for result in results:
+        ops = result['ops']
+        rate = ops / result['seconds'] if result['seconds'] > 0 else 0
+        per_op = result['rest'] / ops if ops else 0
+        print(f"{result['name']:<26} {ops:>6} {result['seconds']:>7.2f} {rate:>8.1f} {result['p50']:>8.1f} {result['p99']:>8.1f} "
+              f"{result['rest']:>6} {per_op:>8.2f} {result['throttled']:>5} {result['errors']:>6}")
+        if routes:
+            for route, count in sorted(result['routes'].items(), key=lambda item: -item[1]):
+                print(f"    {count:>6}  {route}")
+
+async def run(options):
+    fake = await FakeDiscord(window_scale=options.window_scale, shared_429_rate=options.shared_429_rate,
+                             latency=options.latency / 1000).start()
+    fake.install()
+    tracker = DispatchTracker(asyncio.get_running_loop())
+    world = World(fake, options.members, history_days=options.history_days)
+    bot = main.bot
+    try:
+        async with bot:
+            await bot.login('load-test')  # Runs main.setup_hook against the fake
+            bot._connection.parsers['GUILD_CREATE'](world.guild)
+            guild = bot.get_guild(world.guild_id)
+            if main.args.slim_members:
+                main.get_member_index(guild.id).rebuild(main.MemberRecord.from_data(member) for member in world.guild['members'])
+            else:
+                main.get_member_index(guild.id).rebuild(guild.members)
+            config = main.GuildConfig(world.guild_id, int(world.logs['id']), main.DEFAULT_STRIKE_THRESHOLD, options.punishment)
+            await main.store.save_guild_config(config)
+            main.guild_configs[world.guild_id] = config
+
+            results = []
+            for name in options.scenario or SCENARIOS:
+                results += await SCENARIOS[name](world, tracker, options)
+            print_results(results, options.routes)
+    finally:
+        tracker.close()
+        await fake.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline load test for the bot handlers.')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenario to run (repeatable; default: all)')
+    parser.add_argument('--members', type=int, default=2000, help='Members in the synthetic guild')
+    parser.add_argument('--raiders', type=int, default=50, help='strike-burst: members struck up to the threshold')
+    parser.add_argument('--punishment', default='timeout', choices=list(main.PUNISHMENTS), help='strike-burst: punishment on confirm')
+    parser.add_argument('--reactors', type=int, default=300, help='reaction-storm: members reacting')
+    parser.add_argument('--reactions', type=int, default=3000, help='reaction-storm: reaction events')
+    parser.add_argument('--feedback', default='none', choices=['none', 'digest', 'dm', 'button'], help='reaction-storm: panel feedback mode')
+    parser.add_argument('--history', type=int, default=1000, help='nuke: messages in the channel')
+    parser.add_argument('--history-days', type=float, default=20, help='nuke: days the history spans')
+    parser.add_argument('--rate', type=float, default=0, help='Dispatches per second (0 = as fast as possible)')
+    parser.add_argument('--window-scale', type=float, default=0.1, help='Multiplier for every rate-limit window (1 = Discord pacing)')
+    parser.add_argument('--shared-429-rate', type=float, default=0.0, help='Chance of a shared-scope 429 on any request')
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to every REST response')
+    parser.add_argument('--routes', action='store_true', help='Break REST calls down by route')
+    options, _ = parser.parse_known_args()
+    asyncio.run(run(options))
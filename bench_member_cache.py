@@ -0,0 +1,108 @@
+# Memory benchmark for the member cache profiles in main.py.
+#
+# Builds a synthetic guild of N members and measures what each profile keeps alive:
+#   full - discord.py Member objects in the guild cache plus the member index (default/lazy mode)
+#   slim - compact MemberRecords in the member index only (--slim-members), built from
+#          raw GUILD_MEMBERS_CHUNK payloads of 1000 members the way the bot receives them
+#
+# Reports both the memory still held afterwards and the peak while building.
+#
+# Usage: python bench_member_cache.py [--sizes 10000,100000,500000]
+import os
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+
+os.environ['DISCORD_TOKEN'] = ''  # Importing main must never start the bot
+import discord
+import main
+
+GUILD_ID = 1100000000000000000
+ROLE_COUNT = 40
+
+def synthetic_payloads(count, seed=0):
+    rng = random.Random(seed)
+    role_ids = [str(GUILD_ID + 1 + i) for i in range(ROLE_COUNT)]
+    for i in range(count):
+        name = f"player_{rng.randrange(10 ** 8):08d}"
+        yield {
+            'user': {
+                'id': str(GUILD_ID + 10 ** 6 + i),
+                'username': name,
+                'global_name': name.title() if rng.random() < 0.5 else None,
+                'discriminator': '0',
+                'avatar': None,
+                'bot': rng.random() < 0.01,
+            },
+            'nick': f"nick {i}" if rng.random() < 0.2 else None,
+            'roles': rng.sample(role_ids, rng.randrange(4)),
+            'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False,
+            'mute': False,
+            'flags': 0,
+        }
+
+def make_guild(state):
+    roles = [{'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '0', 'position': 0}]
+    roles += [{'id': str(GUILD_ID + 1 + i), 'name': f'role {i}', 'permissions': '0', 'position': i + 1} for i in range(ROLE_COUNT)]
+    return discord.Guild(data={'id': str(GUILD_ID), 'name': 'bench', 'roles': roles}, state=state)
+
+def build_full(payloads, state):
+    guild = make_guild(state)
+    for data in payloads:
+        guild._add_member(discord.Member(data=data, guild=guild, state=state))
+    index = main.MemberIndex()
+    index.rebuild(guild.members)
+    return guild, index
+
+def build_slim(payloads, state):
+    parsers = {'GUILD_MEMBERS_CHUNK': lambda data: None}
+    main.index_raw_member_chunks(parsers)
+    count = -(-len(payloads) // 1000)
+    for i in range(count):
+        parsers['GUILD_MEMBERS_CHUNK']({'guild_id': str(GUILD_ID), 'members': payloads[i * 1000:(i + 1) * 1000],
+                                        'chunk_index': i, 'chunk_count': count, 'nonce': 'bench'})
+    return main.members.pop(GUILD_ID)
+
+# Bytes still allocated after `build` returns, the peak while it ran, and its wall time
+def measure(build, *build_args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = build(*build_args)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, size, peak, elapsed
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,500000', help='Comma-separated member counts')
+    options, _ = parser.parse_known_args()
+
+    print(f"{'members':>9} {'profile':>7} {'MB':>9} {'peak MB':>9} {'bytes/member':>13} {'build s':>8} {'search ms':>10}")
+    for count in (int(size) for size in options.sizes.split(',')):
+        payloads = list(synthetic_payloads(count))
+        for profile in ('full', 'slim'):
+            state = main.bot._connection
+            state.clear()
+            main.role_sets.clear()
+            if profile == 'full':
+                kept, size, peak, elapsed = measure(build_full, payloads, state)
+                index = kept[1]
+            else:
+                kept, size, peak, elapsed = measure(build_slim, payloads, state)
+                index = kept
+            started = time.perf_counter()
+            for prefix in ('p', 'player_1', 'player_12', 'nick 9'):
+                index.search(prefix)
+            search_ms = (time.perf_counter() - started) * 1000 / 4
+            print(f"{count:>9} {profile:>7} {size / 2 ** 20:>9.1f} {peak / 2 ** 20:>9.1f} {size / count:>13.0f} {elapsed:>8.2f} {search_ms:>10.3f}")
+            del kept, index
+    main.bot._connection.clear()
+
+if __name__ == '__main__':
+    main_bench()
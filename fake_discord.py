@@ -0,0 +1,525 @@
+# Offline stand-in for Discord, used by the benchmarks: a local REST server that
+# emulates per-route rate limits (X-RateLimit-* headers and 429s) and keeps just
+# enough state for the bot's handlers, plus builders for gateway dispatch payloads.
+#
+# Point discord.py at it with FakeDiscord.install() after start(); every Route,
+# including interaction and webhook routes, then goes to 127.0.0.1.
+import re
+import json
+import time
+import random
+import asyncio
+import bisect
+import itertools
+from collections import Counter
+from datetime import timedelta
+
+from aiohttp import web
+import discord
+
+API_PREFIX = '/api/v10'
+ALL_PERMISSIONS = str(discord.Permissions.all().value)
+
+_sequence = itertools.count(1)
+
+# discord.py only decodes bodies whose Content-Type is exactly application/json (no charset)
+def json_response(data, status=200, headers=None):
+    return web.Response(body=json.dumps(data).encode(), status=status, headers={'Content-Type': 'application/json', **(headers or {})})
+
+# A unique snowflake for the given time (default: now)
+def snowflake(when=None):
+    return discord.utils.time_snowflake(when or discord.utils.utcnow()) | (next(_sequence) & 0x3FFFFF)
+
+def user_payload(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'global_name': None, 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+def member_payload(user, roles=(), nick=None):
+    return {'user': user, 'nick': nick, 'roles': [str(role_id) for role_id in roles], 'avatar': None,
+            'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0,
+            'communication_disabled_until': None}
+
+def role_payload(role_id, name, position, permissions='0'):
+    return {'id': str(role_id), 'name': name, 'position': position, 'permissions': permissions,
+            'color': 0, 'hoist': False, 'managed': False, 'mentionable': True, 'flags': 0}
+
+def channel_payload(channel_id, guild_id, name, position=0):
+    return {'id': str(channel_id), 'guild_id': str(guild_id), 'type': 0, 'name': name, 'position': position,
+            'permission_overwrites': [], 'nsfw': False, 'parent_id': None, 'topic': None,
+            'rate_limit_per_user': 0, 'last_message_id': None}
+
+def guild_payload(guild_id, owner_id, roles, channels, members):
+    return {'id': str(guild_id), 'name': 'Load test', 'owner_id': str(owner_id), 'roles': roles, 'channels': channels,
+            'members': members, 'member_count': len(members), 'large': len(members) > 250, 'emojis': [],
+            'stickers': [], 'features': [], 'threads': [], 'voice_states': [], 'presences': [],
+            'stage_instances': [], 'guild_scheduled_events': [], 'unavailable': False, 'premium_tier': 0,
+            'preferred_locale': 'en-US', 'verification_level': 0, 'explicit_content_filter': 0,
+            'default_message_notifications': 0, 'mfa_level': 0, 'nsfw_level': 0, 'system_channel_flags': 0}
+
+def message_payload(message_id, channel_id, author, content='', embeds=(), components=(), guild_id=None,
+                    interaction_metadata=None, flags=0):
+    data = {'id': str(message_id), 'channel_id': str(channel_id), 'author': author, 'content': content,
+            'timestamp': discord.utils.snowflake_time(int(message_id)).isoformat(), 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': list(embeds), 'components': list(components), 'pinned': False, 'type': 0, 'flags': flags}
+    if guild_id is not None:
+        data['guild_id'] = str(guild_id)
+    if interaction_metadata is not None:
+        data['interaction_metadata'] = interaction_metadata
+    return data
+
+# INTERACTION_CREATE payloads. `options` are raw option dicts; `resolved` maps
+# "users"/"members"/"roles" to the objects those options refer to.
+def command_interaction(app_id, guild_id, channel, member, name, options=(), resolved=None):
+    interaction_id = snowflake()
+    data = {'id': str(snowflake()), 'name': name, 'type': 1, 'options': list(options)}
+    if resolved:
+        data['resolved'] = resolved
+    return _interaction(interaction_id, 2, app_id, guild_id, channel, member, data)
+
+def component_interaction(app_id, guild_id, channel, member, custom_id, message):
+    data = {'custom_id': custom_id, 'component_type': 2}
+    payload = _interaction(snowflake(), 3, app_id, guild_id, channel, member, data)
+    payload['message'] = message
+    return payload
+
+def _interaction(interaction_id, kind, app_id, guild_id, channel, member, data):
+    return {'id': str(interaction_id), 'application_id': str(app_id), 'type': kind, 'token': f'token-{interaction_id}',
+            'version': 1, 'guild_id': str(guild_id), 'channel_id': channel['id'], 'channel': channel,
+            'member': dict(member, permissions=ALL_PERMISSIONS), 'app_permissions': ALL_PERMISSIONS,
+            'locale': 'en-US', 'guild_locale': 'en-US', 'entitlements': [], 'authorizing_integration_owners': {},
+            'context': 0, 'data': data}
+
+# MESSAGE_REACTION_ADD / MESSAGE_REACTION_REMOVE payloads; only adds carry the member
+def reaction_payload(guild_id, channel_id, message_id, member, emoji, add=True):
+    data = {'user_id': member['user']['id'], 'channel_id': str(channel_id), 'message_id': str(message_id),
+            'guild_id': str(guild_id), 'emoji': {'id': None, 'name': emoji}, 'burst': False, 'type': 0}
+    if add:
+        data['member'] = member
+        data['burst_colors'] = []
+    return data
+
+# Per-route limits: (method, path pattern, bucket, requests per window, window seconds).
+# The first group of the pattern is the major parameter the bucket is keyed on
+# (webhook ID and token together for interaction followups).
+ROUTE_LIMITS = [
+    ('PATCH', r'/guilds/(\d+)/members/\d+', 'member-edit', 10, 10),
+    ('PUT', r'/guilds/(\d+)/members/\d+/roles/\d+', 'member-role', 10, 10),
+    ('DELETE', r'/guilds/(\d+)/members/\d+/roles/\d+', 'member-role', 10, 10),
+    ('POST', r'/channels/(\d+)/messages', 'message-create', 5, 5),
+    ('GET', r'/channels/(\d+)/messages', 'message-list', 5, 5),
+    ('POST', r'/channels/(\d+)/messages/bulk-delete', 'bulk-delete', 1, 1),
+    ('DELETE', r'/channels/(\d+)/messages/\d+', 'message-delete', 5, 1),
+    ('PUT', r'/channels/(\d+)/messages/\d+/reactions/[^/]+/@me', 'reaction', 1, 0.25),
+    ('POST', r'/webhooks/(\d+/[^/]+)', 'followup', 5, 2),
+    ('PATCH', r'/webhooks/(\d+/[^/]+)/messages/@original', 'original-edit', 5, 2),
+]
+
+class FakeDiscord:
+    """REST endpoints for one bot user and the guilds seeded into it.
+
+    window_scale multiplies every rate-limit window (0.1 runs ten times faster
+    than Discord would allow), shared_429_rate is the chance any request gets a
+    shared-scope 429, and latency is added to every response.
+    """
+
+    def __init__(self, window_scale=1.0, global_limit=50, shared_429_rate=0.0, latency=0.0, seed=0):
+        self.window_scale = window_scale
+        self.global_limit = global_limit
+        self.shared_429_rate = shared_429_rate
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.bot_user = user_payload(snowflake(), 'Minebase', bot=True)
+        self.app_id = int(self.bot_user['id'])
+        self.channels = {}  # Channel ID -> channel payload
+        self.members = {}  # (guild ID, user ID) -> member payload
+        self.history = {}  # Channel ID -> sorted message IDs
+        self.messages = {}  # Message ID -> payload, for messages created through the API
+        self.interactions = {}  # Token -> {'channel_id', 'guild_id', 'message_id'}
+        self.calls = Counter()  # "METHOD /route/{id}" -> requests received
+        self.throttled = Counter()  # Same keys -> requests answered with a 429
+        self.member_edits = []  # (perf_counter time, guild ID, member ID) per member edit
+        self.buckets = {}  # (bucket, major ID) -> [remaining, reset at]
+        self.global_window = [0, 0.0]  # Requests so far, window start
+        self.routes = self._build_routes()
+        self.runner = None
+        self.base = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', API_PREFIX + '/{path:.*}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f'http://127.0.0.1:{port}{API_PREFIX}'
+        return self
+
+    def install(self):
+        discord.http.Route.BASE = self.base
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def reset_counters(self):
+        self.calls.clear()
+        self.throttled.clear()
+        self.member_edits.clear()
+
+    # Seeding
+
+    def add_guild(self, guild):
+        for channel in guild['channels']:
+            self.channels[int(channel['id'])] = channel
+            self.history.setdefault(int(channel['id']), [])
+        for member in guild['members']:
+            self.members[(int(guild['id']), int(member['user']['id']))] = member
+
+    # Fill a channel with `count` messages spread evenly over the last `days` days
+    def seed_history(self, channel_id, count, days):
+        now = discord.utils.utcnow()
+        step = timedelta(days=days) / max(count, 1)
+        oldest = now - step * (count - 1) - timedelta(seconds=1)
+        if discord.utils.snowflake_time(channel_id) > oldest:
+            raise ValueError(f'channel {channel_id} was created after the history seeded into it; create it with an older snowflake')
+        ids = [snowflake(now - step * i - timedelta(seconds=1)) for i in range(count)]
+        self.history[channel_id] = sorted(set(self.history.get(channel_id, [])) | set(ids))
+
+    # Learn guilds, channels, members, messages and interaction tokens from a gateway
+    # dispatch, so a recorded session's REST calls find what they refer to
+    def observe(self, event, data):
+        if event == 'GUILD_CREATE' and not data.get('unavailable'):
+            self.add_guild(data)
+        elif event == 'GUILD_MEMBERS_CHUNK':
+            for member in data['members']:
+                self.members[(int(data['guild_id']), int(member['user']['id']))] = member
+        elif event in ('GUILD_MEMBER_ADD', 'GUILD_MEMBER_UPDATE'):
+            self.members[(int(data['guild_id']), int(data['user']['id']))] = data
+        elif event in ('MESSAGE_REACTION_ADD', 'INTERACTION_CREATE') and data.get('guild_id') and data.get('member'):
+            self.members.setdefault((int(data['guild_id']), int(data['member']['user']['id'])), data['member'])
+        elif event == 'CHANNEL_CREATE':
+            self.channels[int(data['id'])] = data
+            self.history.setdefault(int(data['id']), [])
+        elif event == 'MESSAGE_CREATE':
+            bisect.insort(self.history.setdefault(int(data['channel_id']), []), int(data['id']))
+        if event == 'INTERACTION_CREATE' and data.get('guild_id'):
+            self.register_interaction(data)
+
+    def register_interaction(self, payload):
+        self.interactions[payload['token']] = {'channel_id': int(payload['channel_id']),
+                                               'guild_id': int(payload['guild_id']), 'message_id': None}
+
+    # Request handling
+
+    def _build_routes(self):
+        limits = {(method, pattern): (bucket, count, window) for method, pattern, bucket, count, window in ROUTE_LIMITS}
+        table = [
+            ('GET', r'/users/@me', self.get_me),
+            ('GET', r'/oauth2/applications/@me', self.get_application),
+            ('PUT', r'/applications/\d+/commands', self.empty_list),
+            ('PUT', r'/applications/\d+/guilds/\d+/commands', self.empty_list),
+            ('POST', r'/interactions/(\d+)/([^/]+)/callback', self.interaction_callback),
+            ('GET', r'/webhooks/\d+/([^/]+)/messages/@original', self.get_original),
+            ('PATCH', r'/webhooks/(\d+/[^/]+)/messages/@original', self.edit_original),
+            ('POST', r'/webhooks/(\d+/[^/]+)', self.followup),
+            ('GET', r'/channels/(\d+)', self.get_channel),
+            ('PATCH', r'/channels/(\d+)', self.edit_channel),
+            ('DELETE', r'/channels/(\d+)', self.delete_channel),
+            ('GET', r'/channels/(\d+)/webhooks', self.empty_list),
+            ('GET', r'/channels/(\d+)/messages', self.list_messages),
+            ('POST', r'/channels/(\d+)/messages', self.create_message),
+            ('POST', r'/channels/(\d+)/messages/bulk-delete', self.bulk_delete),
+            ('DELETE', r'/channels/(\d+)/messages/\d+', self.delete_message),
+            ('PUT', r'/channels/(\d+)/messages/\d+/reactions/[^/]+/@me', self.no_content),
+            ('POST', r'/guilds/(\d+)/channels', self.create_channel),
+            ('PATCH', r'/guilds/(\d+)/channels', self.no_content),
+            ('GET', r'/guilds/(\d+)/members/\d+', self.get_member),
+            ('PATCH', r'/guilds/(\d+)/members/\d+', self.edit_member),
+            ('DELETE', r'/guilds/(\d+)/members/\d+', self.no_content),
+            ('PUT', r'/guilds/(\d+)/members/\d+/roles/\d+', self.member_role),
+            ('DELETE', r'/guilds/(\d+)/members/\d+/roles/\d+', self.member_role),
+            ('PUT', r'/guilds/(\d+)/bans/\d+', self.no_content),
+        ]
+        return [(method, re.compile(pattern + '$'), handler, limits.get((method, pattern))) for method, pattern, handler in table]
+
+    async def handle(self, request):
+        path = '/' + request.match_info['path']
+        for method, pattern, handler, limit in self.routes:
+            match = pattern.match(path)
+            if match and method == request.method:
+                break
+        else:
+            return self._error(404, 0, f'No fake route for {request.method} {path}')
+
+        key = f'{request.method} {route_name(path)}'
+        self.calls[key] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        throttled, headers = self._rate_limit(limit, match, exempt=path.startswith(('/interactions/', '/webhooks/')))
+        if throttled is not None:
+            self.throttled[key] += 1
+            return throttled
+        body = await request.json() if request.can_read_body and request.content_type == 'application/json' else None
+        response = await handler(request, match, body)
+        response.headers.update(headers)
+        return response
+
+    # Apply the global and per-route limits; returns (429 response or None, headers for success).
+    # Interaction and webhook-token routes don't count towards the global limit, as on Discord.
+    def _rate_limit(self, limit, match, exempt=False):
+        now = time.monotonic()
+        if not exempt:
+            global_window = self.window_scale
+            if now - self.global_window[1] >= global_window:
+                self.global_window[:] = [0, now]
+            self.global_window[0] += 1
+            if self.global_limit and self.global_window[0] > self.global_limit:
+                retry_after = global_window - (now - self.global_window[1])
+                return self._too_many(retry_after, scope='global'), {}
+        if self.shared_429_rate and self.rng.random() < self.shared_429_rate:
+            return self._too_many(0.05, scope='shared'), {}
+        if limit is None:
+            return None, {}
+
+        bucket_name, count, window = limit
+        window *= self.window_scale
+        major = match.group(1) if match.groups() else ''
+        bucket = self.buckets.get((bucket_name, major))
+        if bucket is None or now >= bucket[1]:
+            bucket = self.buckets[(bucket_name, major)] = [count, now + window]
+        reset_after = bucket[1] - now
+        if bucket[0] <= 0:
+            return self._too_many(reset_after, bucket=bucket_name, limit=count), {}
+        bucket[0] -= 1
+        return None, {
+            'X-RateLimit-Limit': str(count),
+            'X-RateLimit-Remaining': str(bucket[0]),
+            'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Bucket': bucket_name,
+        }
+
+    def _too_many(self, retry_after, scope='user', bucket=None, limit=1):
+        # discord.py treats a 429 without Discord's Via header as a Cloudflare ban
+        headers = {'Retry-After': f'{retry_after:.3f}', 'X-RateLimit-Scope': scope, 'Via': '1.1 google'}
+        if scope == 'global':
+            headers['X-RateLimit-Global'] = 'true'
+        if bucket is not None:
+            headers.update({'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': '0',
+                            'X-RateLimit-Reset-After': f'{retry_after:.3f}', 'X-RateLimit-Bucket': bucket})
+        body = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': scope == 'global'}
+        return json_response(body, status=429, headers=headers)
+
+    def _error(self, status, code, message):
+        return json_response({'code': code, 'message': message}, status=status)
+
+    # Endpoints
+
+    async def no_content(self, request, match, body):
+        return web.Response(status=204)
+
+    async def empty_list(self, request, match, body):
+        return json_response([])
+
+    async def get_me(self, request, match, body):
+        return json_response(self.bot_user)
+
+    async def get_application(self, request, match, body):
+        return json_response({'id': str(self.app_id), 'name': 'Minebase', 'icon': None, 'description': '',
+                                  'rpc_origins': [], 'bot_public': False, 'bot_require_code_grant': False,
+                                  'owner': self.bot_user, 'summary': '', 'verify_key': '', 'flags': 0, 'team': None})
+
+    async def get_channel(self, request, match, body):
+        channel = self.channels.get(int(match.group(1)))
+        if channel is None:
+            return self._error(404, 10003, 'Unknown Channel')
+        return json_response(channel)
+
+    async def edit_channel(self, request, match, body):
+        channel = self.channels.get(int(match.group(1)))
+        if channel is None:
+            return self._error(404, 10003, 'Unknown Channel')
+        channel.update({key: value for key, value in (body or {}).items() if key in ('name', 'position', 'topic')})
+        return json_response(channel)
+
+    async def delete_channel(self, request, match, body):
+        channel = self.channels.pop(int(match.group(1)), None)
+        if channel is None:
+            return self._error(404, 10003, 'Unknown Channel')
+        self.history.pop(int(channel['id']), None)
+        return json_response(channel)
+
+    async def create_channel(self, request, match, body):
+        channel = channel_payload(snowflake(), match.group(1), body.get('name', 'channel'), body.get('position', 0))
+        self.channels[int(channel['id'])] = channel
+        self.history[int(channel['id'])] = []
+        return json_response(channel)
+
+    def _store_message(self, channel_id, body, interaction_metadata=None, flags=0):
+        guild_id = self.channels.get(channel_id, {}).get('guild_id')
+        message = message_payload(snowflake(), channel_id, self.bot_user, (body or {}).get('content') or '',
+                                  (body or {}).get('embeds') or (), (body or {}).get('components') or (),
+                                  guild_id, interaction_metadata, flags=(body or {}).get('flags', flags))
+        self.messages[int(message['id'])] = message
+        bisect.insort(self.history.setdefault(channel_id, []), int(message['id']))
+        return message
+
+    async def create_message(self, request, match, body):
+        channel_id = int(match.group(1))
+        if channel_id not in self.channels:
+            return self._error(404, 10003, 'Unknown Channel')
+        return json_response(self._store_message(channel_id, body))
+
+    async def list_messages(self, request, match, body):
+        channel_id = int(match.group(1))
+        if channel_id not in self.channels:
+            return self._error(404, 10003, 'Unknown Channel')
+        ids = self.history.get(channel_id, [])
+        limit = int(request.query.get('limit', 50))
+        if 'after' in request.query:
+            start = bisect.bisect_right(ids, int(request.query['after']))
+            page = ids[start:start + limit]
+        else:
+            end = bisect.bisect_left(ids, int(request.query['before'])) if 'before' in request.query else len(ids)
+            page = ids[max(end - limit, 0):end]
+        author = user_payload(1, 'chatter')
+        return json_response([self.messages.get(message_id) or message_payload(message_id, channel_id, author, f'message {message_id}')
+                                  for message_id in reversed(page)])
+
+    def _remove_messages(self, channel_id, message_ids):
+        ids = self.history.get(channel_id, [])
+        for message_id in message_ids:
+            i = bisect.bisect_left(ids, message_id)
+            if i < len(ids) and ids[i] == message_id:
+                del ids[i]
+            self.messages.pop(message_id, None)
+
+    async def bulk_delete(self, request, match, body):
+        channel_id = int(match.group(1))
+        message_ids = [int(message_id) for message_id in body['messages']]
+        cutoff = discord.utils.utcnow() - timedelta(days=14)
+        if any(discord.utils.snowflake_time(message_id) < cutoff for message_id in message_ids):
+            return self._error(400, 50034, 'You can only bulk delete messages that are under 14 days old.')
+        self._remove_messages(channel_id, message_ids)
+        return web.Response(status=204)
+
+    async def delete_message(self, request, match, body):
+        channel_id = int(match.group(1))
+        message_id = int(request.path.rsplit('/', 1)[1])
+        ids = self.history.get(channel_id)
+        if ids is None:
+            return self._error(404, 10003, 'Unknown Channel')
+        i = bisect.bisect_left(ids, message_id)
+        if i == len(ids) or ids[i] != message_id:
+            return self._error(404, 10008, 'Unknown Message')
+        self._remove_messages(channel_id, [message_id])
+        return web.Response(status=204)
+
+    async def interaction_callback(self, request, match, body):
+        interaction = self.interactions.get(match.group(2))
+        if interaction is None:
+            return self._error(404, 10062, 'Unknown interaction')
+        if body['type'] in (4, 5):  # Message (or deferred message) in the channel
+            metadata = {'id': match.group(1), 'type': 2, 'user': self.bot_user, 'authorizing_integration_owners': {}}
+            message = self._store_message(interaction['channel_id'], body.get('data'), metadata)
+            interaction['message_id'] = int(message['id'])
+        elif body['type'] == 7 and interaction.get('message_id'):  # Update the message the component is on
+            self.messages[interaction['message_id']].update(body.get('data') or {})
+        return web.Response(status=204)
+
+    def _original(self, token):
+        interaction = self.interactions.get(token)
+        return self.messages.get(interaction['message_id']) if interaction and interaction['message_id'] else None
+
+    async def get_original(self, request, match, body):
+        message = self._original(match.group(1))
+        if message is None:
+            return self._error(404, 10008, 'Unknown Message')
+        return json_response(message)
+
+    async def edit_original(self, request, match, body):
+        message = self._original(request.path.split('/')[-3])
+        if message is None:
+            return self._error(404, 10008, 'Unknown Message')
+        message.update({key: value for key, value in (body or {}).items() if key in ('content', 'embeds', 'components')})
+        return json_response(message)
+
+    async def followup(self, request, match, body):
+        interaction = self.interactions.get(request.path.rsplit('/', 1)[1])
+        if interaction is None:
+            return self._error(404, 10015, 'Unknown Webhook')
+        return json_response(self._store_message(interaction['channel_id'], body))
+
+    async def get_member(self, request, match, body):
+        member = self.members.get((int(match.group(1)), int(request.path.rsplit('/', 1)[1])))
+        if member is None:
+            return self._error(404, 10007, 'Unknown Member')
+        return json_response(member)
+
+    async def edit_member(self, request, match, body):
+        guild_id, member_id = int(match.group(1)), int(request.path.rsplit('/', 1)[1])
+        member = self.members.get((guild_id, member_id))
+        if member is None:
+            return self._error(404, 10007, 'Unknown Member')
+        if 'roles' in body:
+            member['roles'] = [str(role_id) for role_id in body['roles']]
+        if 'communication_disabled_until' in body:
+            member['communication_disabled_until'] = body['communication_disabled_until']
+        self.member_edits.append((time.perf_counter(), guild_id, member_id))
+        return json_response(member)
+
+    # Add (PUT) or remove (DELETE) one role, leaving the member's other roles alone
+    async def member_role(self, request, match, body):
+        segments = request.path.split('/')
+        guild_id, member_id, role_id = int(match.group(1)), int(segments[-3]), segments[-1]
+        member = self.members.get((guild_id, member_id))
+        if member is None:
+            return self._error(404, 10007, 'Unknown Member')
+        roles = [role for role in member['roles'] if role != role_id]
+        member['roles'] = roles + [role_id] if request.method == 'PUT' else roles
+        self.member_edits.append((time.perf_counter(), guild_id, member_id))
+        return web.Response(status=204)
+
+# "/channels/{id}/messages/{id}"-style name for a request path
+def route_name(path):
+    return '/'.join('{id}' if segment.isdigit() else '{token}' if segment.startswith('token-') else segment
+                    for segment in path.split('/'))
+
+# Summarise latencies in seconds as (p50, p99) in milliseconds
+def percentiles(samples):
+    if not samples:
+        return 0.0, 0.0
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    return pick(0.50), pick(0.99)
+
+# Run a gateway dispatch through the bot's ConnectionState and return the tasks it started
+# (event handlers, command and view callbacks), so callers can await their completion
+class DispatchTracker:
+    def __init__(self, loop):
+        self.loop = loop
+        self.captured = None
+        loop.set_task_factory(self._factory)
+
+    def _factory(self, loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        if self.captured is not None:
+            self.captured.append(task)
+        return task
+
+    def dispatch(self, state, event, data):
+        self.captured = []
+        try:
+            state.parsers[event](data)
+            return self.captured
+        finally:
+            self.captured = None
+
+    def close(self):
+        self.loop.set_task_factory(None)
+
+# The components' custom IDs in a message payload, e.g. for pressing a view's buttons
+def custom_ids(message):
+    return [component['custom_id'] for row in message.get('components', ()) for component in row.get('components', ())
+            if 'custom_id' in component]
@@ -1,18 +1,231 @@
 #!./bot-env/bin/python3
 
+import time
+# Process start time, used to report how long startup took
+PROCESS_STARTED = time.perf_counter()
+
 import os
+import sys
+import builtins
+import contextlib
+
+# Times every module imported while it is active, for the startup report: self time
+# excludes the modules it imported in turn, cumulative time includes them
+class ImportTimer:
+    def __init__(self):
+        self.times = {}  # Module name -> (self seconds, cumulative seconds)
+        self.stack = []  # Time spent in nested imports, per import in progress
+
+    def start(self):
+        self.original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        builtins.__import__ = self.original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = name
+        if level and globals:
+            base = globals.get('__package__', '').rsplit('.', level - 1)[0]
+            module = f'{base}.{name}' if name else base
+        if module in sys.modules:
+            return self.original(name, globals, locals, fromlist, level)
+        self.stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += elapsed
+            self.times[module] = (elapsed - nested, elapsed)
+
+# Wall time of each startup step, reported once when the bot is first ready
+class StartupTimeline:
+    def __init__(self, started):
+        self.started = started
+        self.last = started
+        self.phases = []  # (name, start offset, seconds)
+        self.imports = {}
+        self.done = False
+
+    # End the step that ran since the previous mark; later marks with the same name are ignored
+    def mark(self, name):
+        if self.done or any(phase[0] == name for phase in self.phases):
+            return
+        now = time.perf_counter()
+        self.phases.append((name, self.last - self.started, now - self.last))
+        self.last = now
+
+    # Time a step that may overlap others
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            if not self.done:
+                self.phases.append((name, started - self.started, ended - started))
+
+    # Print the timeline and write it, with per-module import times, to STARTUP_PROFILE_PATH
+    def report(self, path):
+        if self.done:
+            return
+        self.done = True
+        total = time.perf_counter() - self.started
+        print('Startup: ' + ', '.join(f'{name} {seconds:.2f}s' for name, _, seconds in self.phases) + f'; total {total:.2f}s')
+        slowest = sorted(self.imports.items(), key=lambda item: -item[1][0])[:5]
+        print('Slowest imports (self time): ' + ', '.join(f'{module} {times[0] * 1000:.0f}ms' for module, times in slowest))
+        if not path:
+            return
+        profile = {
+            'total_seconds': round(total, 4),
+            'phases': [{'name': name, 'start': round(start, 4), 'seconds': round(seconds, 4)} for name, start, seconds in self.phases],
+            'imports': [{'module': module, 'self_seconds': round(own, 5), 'cumulative_seconds': round(cumulative, 5)}
+                        for module, (own, cumulative) in sorted(self.imports.items(), key=lambda item: -item[1][1])],
+        }
+        try:
+            with open(path, 'w') as file:
+                json.dump(profile, file, indent=2)
+        except OSError as e:
+            print(f"Failed to write the startup profile to {path}: {e}")
+
+startup = StartupTimeline(PROCESS_STARTED)
+
+# Lean imports (on unless LEAN_IMPORTS=0 in the process environment): the bot never joins
+# voice, so PyNaCl is blocked and discord.py skips loading libsodium for its voice client.
+# This only saves time where PyNaCl is installed, e.g. via discord.py[voice]; without it, it does nothing.
+if os.getenv('LEAN_IMPORTS', '1') != '0':
+    sys.modules.setdefault('nacl', None)
+
+import_timer = ImportTimer()
+import_timer.start()
+import json
+import gzip
+import asyncio
+import bisect
+import heapq
+import re
+import hashlib
+import argparse
+import functools
+import sqlite3
+import signal
+import subprocess
+import resource
+from collections import OrderedDict, deque, defaultdict
+from datetime import datetime, timedelta, timezone
 import discord
-from discord.ext import commands
 from discord import app_commands
 from discord.ui import Button, View
+from aiohttp import TraceConfig  # aiohttp.web is imported only when the metrics server starts
 from dotenv import load_dotenv
+import_timer.stop()
+startup.imports = import_timer.times
+startup.mark('imports')
 
 # Load the .env file that contains your token
 load_dotenv()
+startup.mark('dotenv')
 TOKEN = os.getenv('DISCORD_TOKEN')
 
 # Set the log channel ID directly
 LOG_CHANNEL_ID = 1271302668945719439  # Replace with your actual log channel ID
+# Guilds can pick their own log channel with /strikeconfig; this one stays the default for its own guild
+
+# Default number of strikes that asks for confirmation before punishing
+DEFAULT_STRIKE_THRESHOLD = 3
+
+# Default number of days before a strike expires (0 keeps strikes forever)
+DEFAULT_STRIKE_EXPIRY_DAYS = 0
+
+# Maximum number of on-demand fetched members kept in memory in lazy member mode
+MEMBER_CACHE_SIZE = int(os.getenv('MEMBER_CACHE_SIZE', '5000'))
+
+# Number of messages discord.py keeps in its message cache
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', '100'))
+
+# Seconds to collect reaction-role changes in a channel before posting them as one digest message
+ROLE_DIGEST_SECONDS = float(os.getenv('ROLE_DIGEST_SECONDS', '30'))
+
+# Seconds to collect a member's reaction-role clicks before applying them in one edit
+ROLE_DEBOUNCE_SECONDS = float(os.getenv('ROLE_DEBOUNCE_SECONDS', '1.0'))
+
+# Estimated message count above which /nuke replaces the channel with a clone instead of purging it
+NUKE_CLONE_THRESHOLD = int(os.getenv('NUKE_CLONE_THRESHOLD', '5000'))
+
+# Most messages a /nuke dry run scans before extrapolating
+NUKE_DRY_RUN_LIMIT = int(os.getenv('NUKE_DRY_RUN_LIMIT', '5000'))
+
+# Approximate seconds per request for the routes a nuke uses, from Discord's rate-limit buckets:
+# history pages and bulk deletes run well inside their buckets, while deleting messages older
+# than 14 days is throttled to roughly one per second per channel
+NUKE_HISTORY_PAGE_SECONDS = float(os.getenv('NUKE_HISTORY_PAGE_SECONDS', '0.3'))
+NUKE_BULK_DELETE_SECONDS = float(os.getenv('NUKE_BULK_DELETE_SECONDS', '1.0'))
+NUKE_SINGLE_DELETE_SECONDS = float(os.getenv('NUKE_SINGLE_DELETE_SECONDS', '1.0'))
+
+# Seconds between progress updates while /nuke is running
+NUKE_PROGRESS_SECONDS = float(os.getenv('NUKE_PROGRESS_SECONDS', '3'))
+
+# Seconds to collect log channel embeds before sending them together (up to 10 per message)
+LOG_FLUSH_SECONDS = float(os.getenv('LOG_FLUSH_SECONDS', '2'))
+
+# Longest a command waits for startup data it needs before answering "warming up"
+# (interactions must be answered within 3 seconds)
+WARMUP_WAIT_SECONDS = float(os.getenv('WARMUP_WAIT_SECONDS', '2'))
+
+# Most log channels replayed at once
+LOG_REPLAY_CONCURRENCY = int(os.getenv('LOG_REPLAY_CONCURRENCY', '5'))
+
+# Where the startup timeline and per-module import times are written as JSON (empty disables it);
+# cluster processes prefix the file name with their shard range
+STARTUP_PROFILE_PATH = os.getenv('STARTUP_PROFILE_PATH', 'startup_profile.json')
+
+# Local port for the Prometheus /metrics endpoint (0 disables it); cluster processes use consecutive ports from here
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Path to the local SQLite database that stores the bot's state
+DB_PATH = os.getenv('BOT_DB_PATH', 'bot.db')
+
+# Optional development guild; commands sync there instantly instead of globally
+DEV_GUILD_ID = int(os.getenv('DEV_GUILD_ID', '0')) or None
+
+# Command-line switches
+parser = argparse.ArgumentParser(description='Run the bot.')
+parser.add_argument('--force-sync', action='store_true', help='Sync slash commands even if they have not changed')
+parser.add_argument('--lazy-members', action='store_true', help='Skip member chunking at startup and fetch members on demand')
+parser.add_argument('--slim-members', action='store_true', help='Keep no Member objects; index every member as a compact record instead')
+parser.add_argument('--sharded', action='store_true', help='Run as an AutoShardedBot with the shard count Discord recommends')
+parser.add_argument('--shard-count', type=int, help='Total number of shards across all processes (implies --sharded)')
+parser.add_argument('--shard-ids', help='Shards this process runs, e.g. "0-3" or "0,2,4" (requires --shard-count)')
+parser.add_argument('--record-gateway', metavar='PATH', help='Append every raw gateway dispatch to this gzip-compressed JSONL file (contains user data)')
+parser.add_argument('--record-events', help='Only record these comma-separated dispatch types, e.g. "MESSAGE_REACTION_ADD,INTERACTION_CREATE"')
+parser.add_argument('--cluster', type=int, metavar='PROCESSES', help='Launch this many bot processes, each running an equal range of --shard-count shards')
+args, _ = parser.parse_known_args()
+
+# Parse a shard list like "0-3" or "0,2,4"
+def parse_shard_ids(value):
+    shard_ids = []
+    for part in value.split(','):
+        first, _, last = part.partition('-')
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
+SHARD_IDS = parse_shard_ids(args.shard_ids) if args.shard_ids else None
+if SHARD_IDS is not None and not args.shard_count:
+    parser.error('--shard-ids requires --shard-count')
+
+# Whether this process owns a guild's state, i.e. runs the shard the guild lives on
+def owns_guild(guild_id):
+    if SHARD_IDS is None or guild_id is None:
+        return SHARD_IDS is None or 0 in SHARD_IDS  # Rows without a guild belong to the primary process
+    return (guild_id >> 22) % args.shard_count in SHARD_IDS
+
+# The primary process (the only one, or the one running shard 0) handles global work,
+# i.e. command sync; every process replays the log channels of the guilds it owns
+IS_PRIMARY = SHARD_IDS is None or 0 in SHARD_IDS
 
 # Define intents
 intents = discord.Intents.default()
@@ -22,62 +235,1191 @@ intents.guild_messages = True
 intents.members = True  # Required to fetch member list
 intents.reactions = True  # Required to handle reactions
 
-# Create a bot instance with a command prefix and specified intents
-bot = commands.Bot(command_prefix='!', intents=intents)
+# In-process metrics rendered in the Prometheus text format
+class Metrics:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+    def __init__(self):
+        self.help = {}  # Metric name -> (type, help text)
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.gauges = {}  # Name -> callable returning the current value
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, amount=1, **labels):
+        self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = [0] * (len(self.BUCKETS) + 2)
+        counts = self.histograms[key]
+        counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        counts[-1] += value
+
+    def gauge(self, name, func):
+        self.gauges[name] = func
+
+    @staticmethod
+    def _labels(labels, **extra):
+        pairs = list(labels) + list(extra.items())
+        if not pairs:
+            return ''
+        escaped = ((k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+    def render(self):
+        lines = []
+        for name, (kind, text) in self.help.items():
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in self.counters.items():
+                    if metric == name:
+                        lines.append(f'{name}{self._labels(labels)} {value:g}')
+            elif kind == 'histogram':
+                for (metric, labels), counts in self.histograms.items():
+                    if metric != name:
+                        continue
+                    total = 0
+                    for bound, count in zip(self.BUCKETS + ('+Inf',), counts):
+                        total += count
+                        lines.append(f'{name}_bucket{self._labels(labels, le=bound)} {total}')
+                    lines.append(f'{name}_sum{self._labels(labels)} {counts[-1]:g}')
+                    lines.append(f'{name}_count{self._labels(labels)} {total}')
+            elif kind == 'gauge' and name in self.gauges:
+                value = self.gauges[name]()
+                if value == value:  # Skip NaN, e.g. latency before the first heartbeat
+                    lines.append(f'{name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+metrics.describe('bot_command_duration_seconds', 'histogram', 'Time spent handling each application command.')
+metrics.describe('bot_event_duration_seconds', 'histogram', 'Time spent in each gateway event handler.')
+metrics.describe('bot_rest_requests_total', 'counter', 'REST requests by method, route and status.')
+metrics.describe('bot_rest_duration_seconds', 'histogram', 'REST request latency by method and route.')
+metrics.describe('bot_rate_limited_total', 'counter', '429 responses by route.')
+metrics.describe('bot_rate_limit_wait_seconds_total', 'counter',
+                 'Seconds a route was held for rate limits, by cause: "429" (Retry-After) or "bucket" (exhausted bucket, waited out before any 429).')
+metrics.describe('bot_strikes_expired_total', 'counter', 'Strikes dropped by the expiry sweeper after aging out.')
+metrics.describe('bot_gateway_latency_seconds', 'gauge', 'Latency between a gateway heartbeat and its acknowledgement.')
 
-# Dictionary to store strikes for each user by their user ID
-strikes = {}
-# Dictionary to store members by name for quick lookup
+# Collapse a Discord API URL into a route template, e.g. /channels/{id}/messages/{id}
+def route_template(url):
+    path = url.path.split('/api/v10', 1)[-1]
+    segments = []
+    for segment in path.split('/'):
+        if segment.isdigit() and len(segment) >= 15:
+            segments.append('{id}')
+        elif len(segment) >= 60:
+            segments.append('{token}')  # Interaction and webhook tokens
+        else:
+            segments.append(segment)
+    return '/'.join(segments)
+
+# aiohttp trace hooks that record every REST call discord.py makes
+async def on_rest_request_start(session, context, params):
+    context.started = time.perf_counter()
+
+async def on_rest_request_end(session, context, params):
+    route = route_template(params.url)
+    status = params.response.status
+    metrics.inc('bot_rest_requests_total', method=params.method, route=route, status=status)
+    metrics.observe('bot_rest_duration_seconds', time.perf_counter() - context.started, method=params.method, route=route)
+    headers = params.response.headers
+    if status == 429:
+        metrics.inc('bot_rate_limited_total', route=route)
+        metrics.inc('bot_rate_limit_wait_seconds_total', float(headers.get('Retry-After', 0)), route=route, cause='429')
+    elif headers.get('X-RateLimit-Remaining') == '0':
+        # discord.py sleeps X-RateLimit-Reset-After before sending anything else on this bucket
+        metrics.inc('bot_rate_limit_wait_seconds_total', float(headers.get('X-RateLimit-Reset-After', 0)), route=route, cause='bucket')
+
+rest_trace = TraceConfig()
+rest_trace.on_request_start.append(on_rest_request_start)
+rest_trace.on_request_end.append(on_rest_request_end)
+
+# Command tree that times every application command
+class InstrumentedTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        interaction.extras['started'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        record_command(interaction, 'error')
+        await super().on_error(interaction, error)
+
+def record_command(interaction, status):
+    started = interaction.extras.get('started')
+    if started is not None and interaction.command is not None:
+        metrics.observe('bot_command_duration_seconds', time.perf_counter() - started,
+                        command=interaction.command.qualified_name, status=status)
+
+# Behaviour shared by the single-connection and sharded bots: time every event
+# handler registered with @bot.event and flush queued log messages before disconnecting
+class MinebaseBotMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tree = InstrumentedTree(self)
+
+    async def close(self):
+        await log_publisher.drain()
+        strikes.stop()
+        deletion_queue.stop()
+        if gateway_recorder is not None:
+            gateway_recorder.close()
+        await super().close()
+
+    def event(self, coro):
+        if not coro.__name__.startswith('on_'):
+            return super().event(coro)
+
+        @functools.wraps(coro)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await coro(*args, **kwargs)
+            finally:
+                metrics.observe('bot_event_duration_seconds', time.perf_counter() - started, event=coro.__name__)
+        return super().event(timed)
+
+# Plain clients rather than commands.Bot: every command is a slash command, so the
+# prefix-command extension would only add import time and per-message parsing
+class MinebaseBot(MinebaseBotMixin, discord.Client):
+    pass
+
+class ShardedMinebaseBot(MinebaseBotMixin, discord.AutoShardedClient):
+    pass
+
+# Create a bot instance with the specified intents
+bot_options = {
+    # Reaction roles use raw events, so only a small message cache is needed (0 disables it)
+    'max_messages': MESSAGE_CACHE_SIZE or None,
+    'http_trace': rest_trace,
+}
+if args.lazy_members or args.slim_members:
+    # Don't download every member before on_ready; members are fetched when a command needs them
+    # (lazy) or chunked straight into the compact member index after on_ready (slim)
+    bot_options['chunk_guilds_at_startup'] = False
+    bot_options['member_cache_flags'] = discord.MemberCacheFlags.none()
+if args.sharded or args.shard_count:
+    if args.shard_count:
+        bot_options['shard_count'] = args.shard_count
+    if SHARD_IDS is not None:
+        bot_options['shard_ids'] = SHARD_IDS
+    bot = ShardedMinebaseBot(intents=intents, **bot_options)
+else:
+    bot = MinebaseBot(intents=intents, **bot_options)
+metrics.gauge('bot_gateway_latency_seconds', lambda: bot.latency)
+
+# Dictionary to map guild IDs to a searchable index of their members
 members = {}
-# Dictionary to map message IDs to reaction-role configurations
+# Dictionary to map message IDs to {emoji key: role ID} reaction-role configurations
 reaction_roles = {}
+# Dictionary to map reaction-role panel message IDs to their feedback mode
+panel_feedback = {}
 
-# Sync the commands to Discord
+# Shared role-ID tuples, so members with the same roles reference one tuple
+role_sets = {}
+
+def intern_roles(role_ids):
+    key = tuple(sorted(role_ids))
+    return role_sets.setdefault(key, key)
+
+# Compact copy of the member fields the bot reads: ID, names, role IDs and the bot flag.
+# Names are interned and role tuples shared, so a large guild costs a few objects per member
+class MemberRecord:
+    __slots__ = ('id', 'name', 'display_name', 'role_ids', 'bot')
+
+    def __init__(self, member_id, name, display_name, role_ids=(), bot=False):
+        self.id = member_id
+        self.name = sys.intern(name)
+        self.display_name = sys.intern(display_name)
+        self.role_ids = intern_roles(role_ids)
+        self.bot = bot
+
+    @classmethod
+    def from_member(cls, member):
+        return cls(member.id, member.name, member.display_name,
+                   (role.id for role in member.roles if not role.is_default()), member.bot)
+
+    # Build a record from a raw gateway or REST member payload
+    @classmethod
+    def from_data(cls, data):
+        user = data['user']
+        name = user['username']
+        return cls(int(user['id']), name, data.get('nick') or user.get('global_name') or name,
+                   (int(role_id) for role_id in data.get('roles', ())), user.get('bot', False))
+
+def as_record(member):
+    return member if isinstance(member, MemberRecord) else MemberRecord.from_member(member)
+
+# Member records for one guild, keyed by ID, with a sorted key list for prefix search
+class MemberIndex:
+    def __init__(self):
+        self.records = {}  # Member ID -> MemberRecord
+        self.keys = []  # Sorted (casefolded name, member ID) pairs
+
+    @staticmethod
+    def _keys_for(record):
+        return {(sys.intern(record.name.casefold()), record.id), (sys.intern(record.display_name.casefold()), record.id)}
+
+    # Build the index for a whole guild with a single sort; accepts Members or MemberRecords
+    def rebuild(self, guild_members):
+        self.records = {record.id: record for record in map(as_record, guild_members)}
+        self.keys = sorted(key for record in self.records.values() for key in self._keys_for(record))
+
+    def get(self, member_id):
+        return self.records.get(member_id)
+
+    def add(self, member):
+        record = as_record(member)
+        self.remove(record.id)
+        self.records[record.id] = record
+        for key in self._keys_for(record):
+            bisect.insort(self.keys, key)
+
+    def remove(self, member_id):
+        record = self.records.pop(member_id, None)
+        if record is None:
+            return
+        for key in self._keys_for(record):
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    # Up to `limit` (member ID, label) pairs whose name or display name starts with `prefix`
+    def search(self, prefix, limit=25):
+        prefix = prefix.casefold()
+        results = {}
+        i = bisect.bisect_left(self.keys, (prefix,))
+        while i < len(self.keys) and len(results) < limit:
+            key, member_id = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            if member_id not in results:
+                record = self.records[member_id]
+                results[member_id] = record.display_name if record.display_name == record.name else f"{record.display_name} ({record.name})"
+            i += 1
+        return list(results.items())
+
+# Bounded least-recently-used cache of members fetched on demand. In lazy mode it also
+# bounds the member index: members leave the index when they're evicted from here.
+class MemberLRU:
+    def __init__(self, maxsize, evicts_index=False):
+        self.maxsize = maxsize
+        self.evicts_index = evicts_index
+        self.entries = OrderedDict()  # (guild ID, member ID) -> Member
+
+    def get(self, guild_id, member_id):
+        member = self.entries.get((guild_id, member_id))
+        if member is not None:
+            self.entries.move_to_end((guild_id, member_id))
+        return member
+
+    def put(self, member):
+        key = (member.guild.id, member.id)
+        self.entries[key] = member
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            (guild_id, member_id), _ = self.entries.popitem(last=False)
+            if self.evicts_index:
+                get_member_index(guild_id).remove(member_id)
+
+    def discard(self, guild_id, member_id):
+        self.entries.pop((guild_id, member_id), None)
+
+member_cache = MemberLRU(MEMBER_CACHE_SIZE, evicts_index=args.lazy_members and not args.slim_members)
+
+# Look up a member from the gateway cache, then the LRU, then the API
+async def get_member(guild, member_id):
+    member = guild.get_member(member_id) or member_cache.get(guild.id, member_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(member_id)
+        except discord.NotFound:
+            return None
+        member_cache.put(member)
+    return member
+
+# Search members by name prefix over the gateway and remember the results
+async def query_members(guild, prefix, limit=25):
+    try:
+        found = await guild.query_members(query=prefix, limit=limit)
+    except asyncio.TimeoutError:
+        return []  # The gateway didn't answer in time; suggest from what is already indexed
+    index = get_member_index(guild.id)
+    for member in found:
+        member_cache.put(member)
+        index.add(member)
+    return found
+
+def get_member_index(guild_id):
+    if guild_id not in members:
+        members[guild_id] = MemberIndex()
+    return members[guild_id]
+
+# Per-guild settings for strikes
+class GuildConfig:
+    __slots__ = ('guild_id', 'log_channel_id', 'strike_threshold', 'punishment', 'strike_expiry_days')
+
+    def __init__(self, guild_id, log_channel_id=None, strike_threshold=DEFAULT_STRIKE_THRESHOLD, punishment='none',
+                 strike_expiry_days=DEFAULT_STRIKE_EXPIRY_DAYS):
+        self.guild_id = guild_id
+        self.log_channel_id = log_channel_id
+        self.strike_threshold = strike_threshold
+        self.punishment = punishment
+        self.strike_expiry_days = strike_expiry_days
+
+    # Seconds a strike stays active in this guild, or None if strikes never expire
+    @property
+    def strike_lifetime(self):
+        return self.strike_expiry_days * 86400 if self.strike_expiry_days else None
+
+# Dictionary to cache guild settings by guild ID, loaded once at startup and
+# replaced whenever /strikeconfig changes them
+guild_configs = {}
+# Guild that owns the hardcoded LOG_CHANNEL_ID, resolved at startup
+legacy_guild_id = None
+
+def get_guild_config(guild_id):
+    config = guild_configs.get(guild_id)
+    if config is None:
+        # Guilds without saved settings get the defaults; the hardcoded log channel is only the default for its own guild
+        config = GuildConfig(guild_id, LOG_CHANNEL_ID if guild_id == legacy_guild_id else None)
+        guild_configs[guild_id] = config
+    return config
+
+# Startup work still in progress, per kind of data ("strikes", "members") and guild
+# (None for every guild), so commands wait for what they need instead of using partial state
+class ReadinessGate:
+    def __init__(self):
+        self.pending = {}  # (kind, guild ID or None) -> event set when the work finishes
+
+    def begin(self, kind, guild_id=None):
+        self.pending.setdefault((kind, guild_id), asyncio.Event())
+
+    def finish(self, kind, guild_id=None):
+        event = self.pending.pop((kind, guild_id), None)
+        if event is not None:
+            event.set()
+
+    # True once the data is ready, False if it still isn't after `timeout` seconds
+    async def wait(self, kind, guild_id=None, timeout=WARMUP_WAIT_SECONDS):
+        events = [self.pending[key] for key in ((kind, guild_id), (kind, None)) if key in self.pending]
+        if not events:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*(event.wait() for event in events)), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+readiness = ReadinessGate()
+
+# Wait briefly (WARMUP_WAIT_SECONDS in total) for the data a command needs, or tell the
+# user the bot is still warming up
+async def ensure_ready(interaction, *kinds):
+    deadline = time.perf_counter() + WARMUP_WAIT_SECONDS
+    for kind in kinds:
+        if not await readiness.wait(kind, interaction.guild_id, timeout=max(deadline - time.perf_counter(), 0)):
+            await interaction.response.send_message("The bot is still warming up; please try again in a few seconds.", ephemeral=True)
+            return False
+    return True
+
+# Local SQLite store: the append-only strike ledger (source of truth for `strikes`),
+# guild settings (source of truth for `guild_configs`) and the reaction-role
+# registry (source of truth for `reaction_roles`)
+class BotStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = asyncio.Lock()  # One statement at a time on the shared connection
+
+    async def _run(self, func, *args):
+        async with self.lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _open(self):
+        # Cluster processes share this file, so wait for another writer instead of failing
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.create_function('owns_guild', 1, owns_guild, deterministic=True)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # One write transaction for the whole schema check, so cluster processes opening an
+        # old database together migrate it one after another instead of racing on ALTER TABLE
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS strike_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "guild_id INTEGER, "
+            "user_id INTEGER NOT NULL, "
+            "delta INTEGER NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS guild_config ("
+            "guild_id INTEGER PRIMARY KEY, "
+            "log_channel_id INTEGER, "
+            "strike_threshold INTEGER NOT NULL, "
+            "punishment TEXT NOT NULL, "
+            f"strike_expiry_days INTEGER NOT NULL DEFAULT {DEFAULT_STRIKE_EXPIRY_DAYS})"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reaction_roles ("
+            "guild_id INTEGER NOT NULL, "
+            "message_id INTEGER NOT NULL, "
+            "emoji_key TEXT NOT NULL, "
+            "role_id INTEGER NOT NULL, "
+            "PRIMARY KEY (message_id, emoji_key))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS deletion_queue ("
+            "channel_id INTEGER NOT NULL, "
+            "message_id INTEGER NOT NULL, "
+            "guild_id INTEGER, "
+            "PRIMARY KEY (channel_id, message_id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reaction_role_panels ("
+            "message_id INTEGER PRIMARY KEY, "
+            "guild_id INTEGER NOT NULL, "
+            "feedback TEXT NOT NULL)"
+        )
+        # Columns added after a table was first created
+        for table in ('deletion_queue', 'strike_events'):
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if 'guild_id' not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(guild_config)")}
+        if 'strike_expiry_days' not in columns:
+            conn.execute(f"ALTER TABLE guild_config ADD COLUMN strike_expiry_days INTEGER NOT NULL DEFAULT {DEFAULT_STRIKE_EXPIRY_DAYS}")
+        conn.execute("CREATE INDEX IF NOT EXISTS strike_events_member ON strike_events (guild_id, user_id)")
+        conn.execute("DROP INDEX IF EXISTS strike_events_user")
+        # The single log checkpoint became one per log channel
+        conn.execute("UPDATE meta SET key = ? WHERE key = 'log_checkpoint'", (f'log_checkpoint:{LOG_CHANNEL_ID}',))
+        conn.commit()
+        return conn
+
+    async def open(self):
+        self.conn = await asyncio.to_thread(self._open)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # Creation times of the active strikes per guild and user, as {guild ID: {user ID: [times]}},
+    # folded from the ledger in one pass. `cutoffs` maps guild IDs to the time before which
+    # their strikes have expired (default_cutoff for the rest). Events before a guild's cutoff
+    # are skipped: they added or revoked strikes that are older still.
+    async def load_active_strikes(self, cutoffs, default_cutoff=0, guild_id=None):
+        def query():
+            sql = "SELECT guild_id, user_id, delta, created_at FROM strike_events WHERE owns_guild(guild_id)"
+            params = ()
+            if guild_id is not None:
+                sql += " AND guild_id = ?"
+                params = (guild_id,)
+            active = defaultdict(dict)
+            for event_guild_id, user_id, delta, created_at in self.conn.execute(sql + " ORDER BY id", params):
+                if created_at > cutoffs.get(event_guild_id, default_cutoff):
+                    apply_strike_event(active[event_guild_id].setdefault(user_id, []), delta, created_at)
+            for users in active.values():
+                for user_id in [user_id for user_id, times in users.items() if not times]:
+                    del users[user_id]
+            return active
+        return await self._run(query)
+
+    # Strikes recorded before they were scoped to a guild belong to the legacy log channel's guild
+    async def assign_legacy_strikes(self, guild_id):
+        def update():
+            with self.conn:
+                self.conn.execute("UPDATE strike_events SET guild_id = ? WHERE guild_id IS NULL", (guild_id,))
+        await self._run(update)
+
+    async def load_guild_configs(self):
+        def query():
+            rows = self.conn.execute(
+                "SELECT guild_id, log_channel_id, strike_threshold, punishment, strike_expiry_days FROM guild_config WHERE owns_guild(guild_id)"
+            )
+            return {row[0]: GuildConfig(*row) for row in rows}
+        return await self._run(query)
+
+    async def save_guild_config(self, config):
+        def update():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO guild_config (guild_id, log_channel_id, strike_threshold, punishment, strike_expiry_days) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (config.guild_id, config.log_channel_id, config.strike_threshold, config.punishment, config.strike_expiry_days),
+                )
+        await self._run(update)
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def _advance_checkpoint(self, channel_id, message_id):
+        key = f'log_checkpoint:{channel_id}'
+        current = self._get_meta(key)
+        if current is None or int(current) < message_id:
+            self._set_meta(key, message_id)
+
+    # Append one or more (user_id, delta, created_at) events for a guild in a single transaction,
+    # optionally moving a log channel's (channel_id, message_id) checkpoint forward in the same commit
+    async def record_strikes(self, guild_id, events, checkpoint=None):
+        def insert():
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO strike_events (guild_id, user_id, delta, created_at) VALUES (?, ?, ?, ?)",
+                    [(guild_id, user_id, delta, created_at) for user_id, delta, created_at in events],
+                )
+                if checkpoint is not None:
+                    self._advance_checkpoint(*checkpoint)
+        await self._run(insert)
+
+    # Every reaction-role panel as {message ID: {emoji key: role ID}}
+    async def load_reaction_roles(self):
+        def query():
+            panels = {}
+            rows = self.conn.execute("SELECT message_id, emoji_key, role_id FROM reaction_roles WHERE owns_guild(guild_id)")
+            for message_id, key, role_id in rows:
+                panels.setdefault(message_id, {})[key] = role_id
+            return panels
+        return await self._run(query)
+
+    # Feedback mode of every reaction-role panel as {message ID: mode}
+    async def load_panel_feedback(self):
+        def query():
+            return dict(self.conn.execute("SELECT message_id, feedback FROM reaction_role_panels WHERE owns_guild(guild_id)"))
+        return await self._run(query)
+
+    async def add_reaction_roles(self, guild_id, message_id, mapping, feedback):
+        def insert():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO reaction_role_panels (message_id, guild_id, feedback) VALUES (?, ?, ?)",
+                    (message_id, guild_id, feedback),
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO reaction_roles (guild_id, message_id, emoji_key, role_id) VALUES (?, ?, ?, ?)",
+                    [(guild_id, message_id, key, role_id) for key, role_id in mapping.items()],
+                )
+        await self._run(insert)
+
+    async def delete_reaction_roles(self, message_ids=(), role_ids=()):
+        def delete():
+            with self.conn:
+                self.conn.executemany("DELETE FROM reaction_roles WHERE message_id = ?", [(i,) for i in message_ids])
+                self.conn.executemany("DELETE FROM reaction_role_panels WHERE message_id = ?", [(i,) for i in message_ids])
+                self.conn.executemany("DELETE FROM reaction_roles WHERE role_id = ?", [(i,) for i in role_ids])
+        await self._run(delete)
+
+    # Messages waiting for background deletion as {channel ID: (guild ID, [message IDs, newest first])}
+    async def load_deletions(self):
+        def query():
+            queues = {}
+            rows = self.conn.execute(
+                "SELECT channel_id, message_id, guild_id FROM deletion_queue WHERE owns_guild(guild_id) ORDER BY channel_id, message_id DESC"
+            )
+            for channel_id, message_id, guild_id in rows:
+                queues.setdefault(channel_id, (guild_id, []))[1].append(message_id)
+            return queues
+        return await self._run(query)
+
+    async def add_deletions(self, guild_id, channel_id, message_ids):
+        def insert():
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO deletion_queue (channel_id, message_id, guild_id) VALUES (?, ?, ?)",
+                    [(channel_id, message_id, guild_id) for message_id in message_ids],
+                )
+        await self._run(insert)
+
+    async def remove_deletions(self, channel_id, message_ids=None):
+        def delete():
+            with self.conn:
+                if message_ids is None:
+                    self.conn.execute("DELETE FROM deletion_queue WHERE channel_id = ?", (channel_id,))
+                else:
+                    self.conn.executemany(
+                        "DELETE FROM deletion_queue WHERE channel_id = ? AND message_id = ?",
+                        [(channel_id, message_id) for message_id in message_ids],
+                    )
+        await self._run(delete)
+
+    # Append one strike event and return the creation times of the user's active strikes
+    # (those after `cutoff`). They're read back from the shared ledger, so they stay correct
+    # when several processes write to it.
+    async def add_strike(self, guild_id, user_id, delta, created_at, cutoff=0):
+        def insert():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO strike_events (guild_id, user_id, delta, created_at) VALUES (?, ?, ?, ?)",
+                    (guild_id, user_id, delta, created_at),
+                )
+                rows = self.conn.execute(
+                    "SELECT delta, created_at FROM strike_events WHERE guild_id = ? AND user_id = ? AND created_at > ? ORDER BY id",
+                    (guild_id, user_id, cutoff),
+                )
+                times = []
+                for event_delta, event_created_at in rows:
+                    apply_strike_event(times, event_delta, event_created_at)
+            return times
+        return await self._run(insert)
+
+    async def get_meta(self, key):
+        return await self._run(self._get_meta, key)
+
+    async def set_meta(self, key, value):
+        def update():
+            with self.conn:
+                self._set_meta(key, value)
+        await self._run(update)
+
+    # ID of the newest message in a log channel already reflected in the ledger
+    async def get_checkpoint(self, channel_id):
+        value = await self._run(self._get_meta, f'log_checkpoint:{channel_id}')
+        return int(value) if value is not None else None
+
+    async def set_checkpoint(self, channel_id, message_id):
+        def update():
+            with self.conn:
+                self._advance_checkpoint(channel_id, message_id)
+        await self._run(update)
+
+store = BotStore(DB_PATH)
+
+# Apply one ledger event to a member's active strike times (oldest first): added strikes
+# are inserted in creation order and each revoked one is the newest still active
+def apply_strike_event(times, delta, created_at):
+    for _ in range(delta):
+        bisect.insort(times, created_at)
+    if delta < 0:
+        del times[max(len(times) + delta, 0):]
+
+# Active strikes per guild and member, kept as creation times. Strikes age out after the
+# guild's strike_expiry_days: reading a count drops its expired strikes (lazy decay), and
+# a sweeper sleeps until the earliest expiry in a min-heap to drop the ones nobody reads,
+# instead of rescanning every member on a timer.
+class StrikeTracker:
+    def __init__(self):
+        self.active = defaultdict(dict)  # Guild ID -> {user ID: [creation times, oldest first]}
+        self.expiries = []  # Min-heap of (expiry time, guild ID, user ID), one per strike; revoked strikes leave stale entries
+        self.wakeup = asyncio.Event()  # Set when a new entry becomes the earliest expiry
+        self.task = None
+
+    # Time before which strikes with this lifetime have expired (0 if they never do)
+    @staticmethod
+    def cutoff(lifetime, now=None):
+        return (now or time.time()) - lifetime if lifetime else 0
+
+    # Replace the active strikes of every guild this process runs, or of one guild
+    # (after its expiry setting changes), from the ledger
+    async def load(self, guild_id=None):
+        now = time.time()
+        guild_ids = [guild_id] if guild_id is not None else guild_configs
+        cutoffs = {gid: self.cutoff(get_guild_config(gid).strike_lifetime, now) for gid in guild_ids}
+        loaded = await store.load_active_strikes(cutoffs, self.cutoff(GuildConfig(None).strike_lifetime, now), guild_id)
+        if guild_id is None:
+            self.active = loaded
+            self.expiries = []
+        else:
+            self.active[guild_id] = loaded.get(guild_id, {})
+            # The guild's entries are rebuilt below; a rare O(n) pass keeps reloads from piling them up
+            self.expiries = [entry for entry in self.expiries if entry[1] != guild_id]
+        for gid, users in loaded.items():
+            lifetime = get_guild_config(gid).strike_lifetime
+            if lifetime:
+                self.expiries.extend((created_at + lifetime, gid, user_id) for user_id, times in users.items() for created_at in times)
+        heapq.heapify(self.expiries)
+        self.wakeup.set()
+
+    def _schedule(self, guild_id, user_id, created_at):
+        lifetime = get_guild_config(guild_id).strike_lifetime
+        if lifetime:
+            entry = (created_at + lifetime, guild_id, user_id)
+            heapq.heappush(self.expiries, entry)
+            if self.expiries[0] is entry:
+                self.wakeup.set()
+
+    # Drop a member's expired strikes and return how many there were
+    def _expire(self, guild_id, user_id, now=None):
+        users = self.active.get(guild_id)
+        times = users.get(user_id) if users else None
+        if not times:
+            return 0
+        expired = bisect.bisect_right(times, self.cutoff(get_guild_config(guild_id).strike_lifetime, now))
+        del times[:expired]
+        if not times:
+            del users[user_id]
+        return expired
+
+    # Number of strikes a member has that haven't expired
+    def count(self, guild_id, user_id):
+        self._expire(guild_id, user_id)
+        return len(self.active.get(guild_id, {}).get(user_id, ()))
+
+    # Every (guild ID, user ID, count) with active strikes
+    def counts(self):
+        for guild_id, users in list(self.active.items()):
+            for user_id in list(users):
+                count = self.count(guild_id, user_id)
+                if count:
+                    yield guild_id, user_id, count
+
+    # Add (delta > 0) or revoke the newest (delta < 0) strikes and return the member's new count
+    async def add(self, guild_id, user_id, delta):
+        now = time.time()
+        times = await store.add_strike(guild_id, user_id, delta, now, self.cutoff(get_guild_config(guild_id).strike_lifetime, now))
+        if times:
+            self.active[guild_id][user_id] = times
+        else:
+            self.active[guild_id].pop(user_id, None)
+        if delta > 0:
+            self._schedule(guild_id, user_id, now)
+        return len(times)
+
+    # Apply an event replayed from a log channel; the caller writes it to the ledger
+    def apply(self, guild_id, user_id, delta, created_at):
+        apply_strike_event(self.active[guild_id].setdefault(user_id, []), delta, created_at)
+        for _ in range(max(delta, 0)):
+            self._schedule(guild_id, user_id, created_at)
+        self._expire(guild_id, user_id)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._sweep())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    # Wake at the earliest expiry, drop whatever has expired by then, and sleep until the next one
+    async def _sweep(self):
+        while True:
+            now = time.time()
+            expired = 0
+            while self.expiries and self.expiries[0][0] <= now:
+                _, guild_id, user_id = heapq.heappop(self.expiries)
+                expired += self._expire(guild_id, user_id, now)
+            if expired:
+                metrics.inc('bot_strikes_expired_total', expired)
+                print(f"Expired {expired} strike(s).")
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.expiries[0][0] - now if self.expiries else None)
+            except asyncio.TimeoutError:
+                pass
+
+strikes = StrikeTracker()
+
+# Serve the metrics in the Prometheus text format on localhost
+async def handle_metrics(request):
+    from aiohttp import web
+    return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8')
+
+async def start_metrics_server():
+    from aiohttp import web
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', METRICS_PORT).start()
+    print(f'Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics')
+
+# Find the guild that owns the hardcoded log channel, once, and file strikes from
+# before per-guild state under it
+async def resolve_legacy_guild():
+    global legacy_guild_id
+    value = await store.get_meta('legacy_guild_id')
+    if value is None:
+        try:
+            channel = await bot.fetch_channel(LOG_CHANNEL_ID)
+        except discord.HTTPException as e:
+            print(f"Log channel with ID {LOG_CHANNEL_ID} not found; it won't be used as a default. ({e})")
+            return
+        value = channel.guild.id
+        await store.assign_legacy_strikes(value)
+        await store.set_meta('legacy_guild_id', value)
+    legacy_guild_id = int(value)
+
+# Appends raw gateway dispatches to gzip-compressed JSON lines, one
+# {"t": type, "ts": unix time, "d": payload} object per dispatch, for replay_gateway.py.
+# Every FLUSH_RECORDS dispatches or FLUSH_SECONDS the current gzip member is finished and
+# a new one started, so a crash or kill loses at most the unfinished tail.
+class GatewayRecorder:
+    FLUSH_RECORDS = 1000
+    FLUSH_SECONDS = 5
+
+    def __init__(self, path, events=None):
+        self.path = path
+        self.events = events  # Dispatch types to record, or None for all of them
+        self.raw = None
+        self.file = None
+        self.count = 0
+        self.unflushed = 0
+        self.flushed_at = 0
+
+    # Wrap the connection's parsers so each payload is written before discord.py handles it
+    def install(self, parsers):
+        self.raw = open(self.path, 'ab')
+        self._start_member()
+        for event, parse in list(parsers.items()):
+            if self.events is None or event in self.events:
+                parsers[event] = self._wrap(event, parse)
+        print(f"Recording gateway dispatches to {self.path}.")
+
+    def _start_member(self):
+        self.file = gzip.GzipFile(fileobj=self.raw, mode='ab')
+        self.unflushed = 0
+        self.flushed_at = time.monotonic()
+
+    # Finish the current gzip member (closing it leaves the underlying file open) and start the next
+    def flush(self):
+        self.file.close()
+        self.raw.flush()
+        self._start_member()
+
+    def _wrap(self, event, parse):
+        def record(data):
+            line = json.dumps({'t': event, 'ts': round(time.time(), 3), 'd': data}, separators=(',', ':')) + '\n'
+            self.file.write(line.encode('utf-8'))
+            self.count += 1
+            self.unflushed += 1
+            if self.unflushed >= self.FLUSH_RECORDS or time.monotonic() - self.flushed_at >= self.FLUSH_SECONDS:
+                self.flush()
+            parse(data)
+        return record
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.raw.close()
+            self.file = self.raw = None
+            print(f"Recorded {self.count} gateway dispatch(es) to {self.path}.")
+
+gateway_recorder = None
+if args.record_gateway:
+    gateway_recorder = GatewayRecorder(args.record_gateway, set(args.record_events.split(',')) if args.record_events else None)
+
+# Load strikes, guild settings and reaction roles from the local store once, before connecting to the gateway
 @bot.event
-async def on_ready():
-    print(f'{bot.user} is connected to Discord!')
-    # Load members into a dictionary
-    for guild in bot.guilds:
-        for member in guild.members:
-            members[member.name.lower()] = member
-            members[member.display_name.lower()] = member
-    
-    log_channel = bot.get_channel(LOG_CHANNEL_ID)
-    if log_channel is None:
-        print(f"Log channel with ID {LOG_CHANNEL_ID} not found. Please check the channel ID.")
-        return
-    
-    await load_strikes_from_logs(log_channel)
-    
+async def setup_hook():
+    startup.mark('login')
+    await store.open()
+    await resolve_legacy_guild()
+    guild_configs.update(await store.load_guild_configs())
+    await strikes.load()
+    strikes.start()
+    reaction_roles.update(await store.load_reaction_roles())
+    panel_feedback.update(await store.load_panel_feedback())
+    bot.add_view(ReactionRolesView())  # Handle "My roles" buttons on panels from earlier runs
+    if args.slim_members or args.lazy_members:
+        index_raw_member_updates()
+    if args.slim_members:
+        index_raw_member_chunks(bot._connection.parsers)
+    if gateway_recorder is not None:
+        gateway_recorder.install(bot._connection.parsers)
+    time_ready_dispatch(bot._connection.parsers)
+    await deletion_queue.start()  # Resume background deletions left over from the last run
+    # Log channels are read over REST, so replay starts now instead of after READY and chunking
+    global startup_replay
+    readiness.begin('members')
+    startup_replay = asyncio.create_task(replay_logs_at_startup())
+    if METRICS_PORT:
+        await start_metrics_server()
+    print(f'Loaded strikes for {sum(len(users) for users in strikes.active.values())} member(s) and {len(reaction_roles)} reaction-role panel(s) from {DB_PATH}.')
+    startup.mark('setup_hook')
+
+# Log replay started by setup_hook, awaited by the first on_ready
+startup_replay = None
+
+# Guilds with a log channel to replay, known from the store before the gateway connects
+def known_log_guilds():
+    guild_ids = {guild_id for guild_id in guild_configs if owns_guild(guild_id)}
+    if legacy_guild_id is not None and owns_guild(legacy_guild_id):
+        guild_ids.add(legacy_guild_id)
+    return [guild_id for guild_id in guild_ids if get_log_channel(guild_id) is not None]
+
+async def replay_logs_at_startup():
+    with startup.phase('log replay'):
+        await replay_all_logs(known_log_guilds())
+
+# Mark the gateway READY in the startup timeline; guild streaming and chunking follow it
+def time_ready_dispatch(parsers):
+    parse_ready = parsers['READY']
+
+    def parse(data):
+        startup.mark('gateway READY')
+        parse_ready(data)
+    parsers['READY'] = parse
+
+# Maximum number of concurrent fetch_user calls for users missing from the cache
+USER_FETCH_CONCURRENCY = 10
+
+# Resolve a user's name from the cache or the member indexes, falling back to the API
+async def resolve_user_name(user_id, semaphore):
+    user = bot.get_user(user_id)
+    if user is None:
+        for guild in bot.guilds:
+            user = guild.get_member(user_id) or get_member_index(guild.id).get(user_id)
+            if user is not None:
+                break
+    if user is None:
+        async with semaphore:
+            try:
+                user = await bot.fetch_user(user_id)
+            except discord.HTTPException:
+                return f"User ID {user_id}"
+    return user.name
+
+# Print the current strike counts, resolving any uncached users concurrently
+async def print_strike_summary():
+    started = time.perf_counter()
     print('Current strike information:')
-    if strikes:
-        for user_id, count in strikes.items():
-            user = await bot.fetch_user(user_id)
-            user_name = user.name if user else f"User ID {user_id}"
-            print(f'{user_name}: {count} strike(s)')
+    counts = list(strikes.counts())
+    if counts:
+        semaphore = asyncio.Semaphore(USER_FETCH_CONCURRENCY)
+        names = await asyncio.gather(*(resolve_user_name(user_id, semaphore) for _, user_id, _ in counts))
+        for user_name, (guild_id, _, count) in zip(names, counts):
+            guild = bot.get_guild(guild_id)
+            print(f'[{guild.name if guild else guild_id}] {user_name}: {count} strike(s)')
     else:
         print('No strikes recorded.')
-    
-    # Sync the slash commands
+    print(f'Strike summary took {time.perf_counter() - started:.2f}s.')
+
+# Hash of the command payloads that would be sent to Discord for a sync
+def command_tree_hash(guild=None):
+    payload = [command.to_dict(bot.tree) for command in bot.tree._get_all_commands(guild=guild)]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+# Sync the slash commands only when they changed since the last successful sync
+async def sync_commands():
+    guild = discord.Object(id=DEV_GUILD_ID) if DEV_GUILD_ID else None
+    if guild is not None:
+        bot.tree.copy_global_to(guild=guild)
+    key = f'command_hash:{DEV_GUILD_ID or "global"}'
+    digest = command_tree_hash(guild)
+    if not args.force_sync and await store.get_meta(key) == digest:
+        print('Commands unchanged, skipping sync.')
+        return
     try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} commands.")
+        synced = await bot.tree.sync(guild=guild)
+        await store.set_meta(key, digest)
+        print(f"Synced {len(synced)} commands" + (f" to guild {DEV_GUILD_ID}." if guild else "."))
     except Exception as e:
         print(f"Failed to sync commands: {e}")
 
+# Peak resident memory of the process in MB (ru_maxrss is bytes on macOS, KB elsewhere)
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+# Sync the commands to Discord
+@bot.event
+async def on_ready():
+    print(f'{bot.user} is connected to Discord!')
+    mode = 'slim' if args.slim_members else 'lazy' if args.lazy_members else 'chunked'
+    print(f'Ready after {time.perf_counter() - PROCESS_STARTED:.2f}s ({mode} members, peak RSS {peak_rss_mb():.0f} MB).')
+    startup.mark('guilds and chunking')
+    # Member indexing, log catch-up (then the summary) and command sync don't depend on
+    # each other, so they run together; commands wait on the readiness gate meanwhile
+    await asyncio.gather(index_all_members(), catch_up_logs(), sync_commands_at_startup())
+    startup.report(STARTUP_PROFILE_PATH)
+
+# Index the members of every guild
+async def index_all_members():
+    readiness.begin('members')
+    try:
+        with startup.phase('member index'):
+            for guild in bot.guilds:
+                if args.slim_members:
+                    # Each chunk is indexed from its raw payload as it arrives (index_raw_member_chunks)
+                    await guild.chunk(cache=False)
+                else:
+                    get_member_index(guild.id).rebuild(guild.members)
+    finally:
+        readiness.finish('members')
+    if args.slim_members:
+        print(f'Indexed {sum(len(index.records) for index in members.values())} member(s), peak RSS {peak_rss_mb():.0f} MB.')
+
+# Catch up on any log entries posted since the last checkpoints, then print the strike summary.
+# The first time, that's the replay setup_hook already started; later READYs replay again.
+async def catch_up_logs():
+    global startup_replay
+    if startup_replay is not None:
+        task, startup_replay = startup_replay, None
+        await task
+    else:
+        await replay_all_logs()
+    with startup.phase('strike summary'):
+        await print_strike_summary()
+
+async def sync_commands_at_startup():
+    if IS_PRIMARY:
+        with startup.phase('command sync'):
+            await sync_commands()
+
+# Record how long each application command took
+@bot.event
+async def on_app_command_completion(interaction, command):
+    record_command(interaction, 'ok')
+
+# Keep the member index current as members join, leave or rename
+@bot.event
+async def on_member_join(member):
+    if member_cache.evicts_index:
+        member_cache.put(member)  # Keeps the lazy-mode index bounded
+    get_member_index(member.guild.id).add(member)
+
+# Raw removals fire whether or not the member was cached
+@bot.event
+async def on_raw_member_remove(payload):
+    get_member_index(payload.guild_id).remove(payload.user.id)
+    member_cache.discard(payload.guild_id, payload.user.id)
+
+@bot.event
+async def on_member_update(before, after):
+    if before.name != after.name or before.display_name != after.display_name or before.roles != after.roles:
+        get_member_index(after.guild.id).add(after)
+
+# Without a member cache discord.py drops GUILD_MEMBER_UPDATE before on_member_update,
+# so the raw payload is indexed before handing it to the library's own parser: every
+# member in slim mode, and in lazy mode the members already in the LRU, which is refreshed too
+def index_raw_member_updates():
+    parsers = bot._connection.parsers
+    parse_member_update = parsers['GUILD_MEMBER_UPDATE']
+
+    def parse(data):
+        guild_id = int(data['guild_id'])
+        guild = bot.get_guild(guild_id)
+        if args.slim_members:
+            get_member_index(guild_id).add(MemberRecord.from_data(data))
+        elif guild is not None and (guild_id, int(data['user']['id'])) in member_cache.entries:
+            member = discord.Member(data=data, guild=guild, state=bot._connection)
+            member_cache.put(member)
+            get_member_index(guild_id).add(member)
+        parse_member_update(data)
+    parsers['GUILD_MEMBER_UPDATE'] = parse
+
+# MemberRecords collected so far per member request: (guild ID, nonce) -> list
+member_chunks = {}
+
+# Slim mode turns each GUILD_MEMBERS_CHUNK payload into MemberRecords as it arrives and
+# hands discord.py the chunk without its members, so a guild's members never exist as
+# Member objects all at once. The index is rebuilt with one sort after the last chunk.
+def index_raw_member_chunks(parsers):
+    parse_chunk = parsers['GUILD_MEMBERS_CHUNK']
+
+    def parse(data):
+        key = (int(data['guild_id']), data.get('nonce'))
+        records = member_chunks.setdefault(key, [])
+        records.extend(MemberRecord.from_data(member) for member in data.get('members', ()))
+        if data.get('chunk_index', 0) + 1 >= data.get('chunk_count', 1):
+            get_member_index(key[0]).rebuild(member_chunks.pop(key))
+        parse_chunk(dict(data, members=[], presences=[]))
+    parsers['GUILD_MEMBERS_CHUNK'] = parse
+
+@bot.event
+async def on_user_update(before, after):
+    if before.name != after.name or before.display_name != after.display_name:
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                get_member_index(guild.id).add(member)
+
+# A guild's log channel, or None if it has none configured
+def get_log_channel(guild_id):
+    channel_id = get_guild_config(guild_id).log_channel_id
+    if channel_id is None:
+        return None
+    return bot.get_channel(channel_id) or bot.get_partial_messageable(channel_id, guild_id=guild_id)
+
+# Write-behind publisher for log channel embeds. Embeds are queued per channel and
+# sent up to 10 per message, when a batch fills up or LOG_FLUSH_SECONDS after the
+# first one was queued, so commands never wait on the log channel.
+class LogPublisher:
+    def __init__(self):
+        self.pending = {}  # Channel ID -> list of embeds waiting to be sent
+        self.full = {}  # Channel ID -> event set when a batch is ready to go early
+        self.tasks = {}  # Channel ID -> sender task
+        self.closing = False
+
+    def publish(self, channel, embed):
+        pending = self.pending.setdefault(channel.id, [])
+        pending.append(embed)
+        event = self.full.setdefault(channel.id, asyncio.Event())
+        if len(pending) >= 10 or self.closing:
+            event.set()
+        if channel.id not in self.tasks:
+            self.tasks[channel.id] = asyncio.create_task(self._send(channel))
+
+    async def _send(self, channel):
+        pending = self.pending[channel.id]
+        event = self.full[channel.id]
+        try:
+            while pending:
+                if not self.closing:
+                    try:
+                        await asyncio.wait_for(event.wait(), LOG_FLUSH_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                batch = pending[:10]
+                del pending[:10]
+                if len(pending) < 10 and not self.closing:
+                    event.clear()
+                try:
+                    message = await channel.send(embeds=batch)
+                except discord.HTTPException as e:
+                    print(f"Failed to send {len(batch)} log embed(s) to channel {channel.id}: {e}")
+                    continue
+                # Our own entries are already in the ledger, so replay can skip past them
+                await store.set_checkpoint(channel.id, message.id)
+        finally:
+            del self.tasks[channel.id]
+
+    # Send everything still queued without waiting for the flush timer
+    async def drain(self):
+        self.closing = True
+        for event in self.full.values():
+            event.set()
+        if self.tasks:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+log_publisher = LogPublisher()
+
 # Function to log a strike to the log channel
-async def log_strike(user, strike_count, channel):
+def log_strike(user, strike_count, channel):
     embed = discord.Embed(title="Strike Logged", color=discord.Color.red())
     embed.add_field(name="User", value=user.mention, inline=True)
     embed.add_field(name="Total Strikes", value=str(strike_count), inline=True)
-    await channel.send(embed=embed)
-
-# Function to load strikes from the log channel
-async def load_strikes_from_logs(channel):
-    global strikes
-    strikes.clear()  # Clear existing strikes to avoid duplication
-    async for message in channel.history(limit=1000):  # Adjust the limit as needed
-        if message.embeds:
+    log_publisher.publish(channel, embed)
+
+# Locks per log channel so that on_ready and on_resumed never replay one concurrently
+replay_locks = defaultdict(asyncio.Lock)
+
+# Function to replay a guild's strike log entries posted after the stored checkpoint
+async def load_strikes_from_logs(channel, guild_id):
+    async with replay_locks[channel.id]:
+        checkpoint = await store.get_checkpoint(channel.id)
+        after = discord.Object(id=checkpoint) if checkpoint else None
+        events = []
+        last_id = None
+        replayed = 0
+        # Oldest first, so the newest "Total Strikes" value for a user wins
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            last_id = message.id
+            replayed += 1
             for embed in message.embeds:
                 if embed.title == "Strike Logged":
                     user_field = next((field for field in embed.fields if field.name == "User"), None)
@@ -89,9 +1431,63 @@ async def load_strikes_from_logs(channel):
                             user_id_str = ''.join(filter(str.isdigit, user_mention))
                             user_id = int(user_id_str)
                             strike_count = int(strikes_field.value)
-                            strikes[user_id] = strike_count
                         except ValueError:
                             print(f"Failed to parse strike information from message ID {message.id}")
+                            continue
+                        # Log entries hold absolute totals; record the difference in the ledger,
+                        # dated by the log message so the strikes expire on the right day
+                        delta = strike_count - strikes.count(guild_id, user_id)
+                        if delta:
+                            created_at = message.created_at.timestamp()
+                            strikes.apply(guild_id, user_id, delta, created_at)
+                            events.append((user_id, delta, created_at))
+
+        if last_id is not None:
+            await store.record_strikes(guild_id, events, checkpoint=(channel.id, last_id))
+        print(f'Replayed {replayed} new log message(s) in channel {channel.id}, {len(events)} strike change(s).')
+
+# Replay the log channels of the given guilds (default: every guild this process runs),
+# a few at a time, holding strike commands for each guild until its replay is done
+async def replay_all_logs(guild_ids=None):
+    if guild_ids is None:
+        guild_ids = [guild.id for guild in bot.guilds]
+    channels = [(guild_id, get_log_channel(guild_id)) for guild_id in guild_ids]
+    channels = [(guild_id, channel) for guild_id, channel in channels if channel is not None]
+    for guild_id, _ in channels:
+        readiness.begin('strikes', guild_id)
+    semaphore = asyncio.Semaphore(LOG_REPLAY_CONCURRENCY)
+
+    async def replay(guild_id, channel):
+        try:
+            async with semaphore:
+                await load_strikes_from_logs(channel, guild_id)
+        except discord.HTTPException as e:
+            print(f"Log channel with ID {channel.id} not found. Please check the channel ID. ({e})")
+        finally:
+            readiness.finish('strikes', guild_id)
+    await asyncio.gather(*(replay(guild_id, channel) for guild_id, channel in channels))
+
+# Replay anything missed while the gateway session was interrupted
+@bot.event
+async def on_resumed():
+    await replay_all_logs()
+
+# Punishments a guild can configure for reaching the strike threshold
+PUNISHMENTS = {
+    'none': 'None',
+    'timeout': 'Time out for 1 day',
+    'kick': 'Kick',
+    'ban': 'Ban',
+}
+
+# Apply a guild's configured punishment to a member
+async def apply_punishment(member, punishment, reason):
+    if punishment == 'timeout':
+        await member.timeout(timedelta(days=1), reason=reason)
+    elif punishment == 'kick':
+        await member.kick(reason=reason)
+    elif punishment == 'ban':
+        await member.ban(reason=reason, delete_message_seconds=0)
 
 # A view with buttons for confirming or canceling the strike
 class ConfirmStrikeView(View):
@@ -104,24 +1500,41 @@ class ConfirmStrikeView(View):
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.success)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user == self.interaction.user:
-            await interaction.response.defer()  # Acknowledge the button press
-            strikes[self.user.id] = self.strike_count
+            if self.is_finished():  # A press queued before the first one stopped the view
+                await interaction.response.send_message("This strike has already been handled.", ephemeral=True)
+                return
+            self.stop()
+            await interaction.response.edit_message(view=None)  # Acknowledge the press and remove the buttons
+            guild_id = self.interaction.guild_id
+            self.strike_count = strikes.count(guild_id, self.user.id)  # Strikes may have expired or been revoked since
+            punishment = get_guild_config(guild_id).punishment
             embed = discord.Embed(title="Strike Confirmed", color=discord.Color.orange())
             embed.add_field(name="User", value=self.user.mention, inline=True)
             embed.add_field(name="Total Strikes", value=str(self.strike_count), inline=True)
+            if punishment != 'none':
+                embed.add_field(name="Punishment", value=PUNISHMENTS[punishment], inline=True)
             # Send a public message confirming the strike
             await self.interaction.followup.send(embed=embed)
-            log_channel = bot.get_channel(LOG_CHANNEL_ID)
+            try:
+                await apply_punishment(self.user, punishment, reason=f"Reached {self.strike_count} strikes")
+            except discord.HTTPException as e:
+                await interaction.followup.send(f"Failed to punish {self.user.mention}: {e}", ephemeral=True)
+            log_channel = get_log_channel(guild_id)
             if log_channel:
-                await log_strike(self.user, self.strike_count, log_channel)
+                log_strike(self.user, self.strike_count, log_channel)
         else:
             await interaction.response.send_message("You cannot confirm this strike.", ephemeral=True)
 
     @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger)
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user == self.interaction.user:
-            await interaction.response.defer()  # Acknowledge the button press
-            strikes[self.user.id] -= 1  # Remove the strike
+            if self.is_finished():  # A press queued before the first one stopped the view
+                await interaction.response.send_message("This strike has already been handled.", ephemeral=True)
+                return
+            self.stop()
+            await interaction.response.edit_message(view=None)  # Acknowledge the press and remove the buttons
+            guild_id = self.interaction.guild_id
+            await strikes.add(guild_id, self.user.id, -1)  # Revoke the newest strike
             await interaction.followup.send(f"Strike on {self.user.mention} has been canceled.", ephemeral=True)
         else:
             await interaction.response.send_message("You cannot cancel this strike.", ephemeral=True)
@@ -130,37 +1543,598 @@ class ConfirmStrikeView(View):
 @bot.tree.command(name='strike', description='Adds a strike to a user.')
 @app_commands.describe(user='The user to strike')
 async def strike(interaction: discord.Interaction, user: discord.Member):
+    if not await ensure_ready(interaction, 'strikes'):
+        return
     user_id = user.id
-    if user_id in strikes:
-        strikes[user_id] += 1
-    else:
-        strikes[user_id] = 1
+    guild_id = interaction.guild_id
+    config = get_guild_config(guild_id)
+    count = await strikes.add(guild_id, user_id, 1)  # Counts only strikes that haven't expired
 
-    if strikes[user_id] == 3:
+    if count == config.strike_threshold:
         # Create the embed for the confirmation
-        embed = discord.Embed(title="Strike Confirmation", description=f"{user.mention} has reached 3 strikes. Continuing will punish the user. Confirm or cancel?", color=discord.Color.orange())
-        view = ConfirmStrikeView(user, strikes[user_id], interaction)
+        embed = discord.Embed(title="Strike Confirmation", description=f"{user.mention} has reached {count} strikes. Continuing will punish the user. Confirm or cancel?", color=discord.Color.orange())
+        view = ConfirmStrikeView(user, count, interaction)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     else:
         # Create the embed for the strike message
         embed = discord.Embed(title="Strike Issued", color=discord.Color.orange())
         embed.add_field(name="User", value=user.mention, inline=True)
-        embed.add_field(name="Total Strikes", value=str(strikes[user_id]), inline=True)
+        embed.add_field(name="Total Strikes", value=str(count), inline=True)
         await interaction.response.send_message(embed=embed)
 
-        # Log the strike to the log channel
-        log_channel = bot.get_channel(LOG_CHANNEL_ID)
+        # Log the strike to the guild's log channel
+        log_channel = get_log_channel(guild_id)
         if log_channel:
-            await log_strike(user, strikes[user_id], log_channel)
+            log_strike(user, count, log_channel)
+
+# Slash command to show how many strikes a member has
+@bot.tree.command(name='strikes', description='Shows how many strikes a member has.')
+@app_commands.describe(member='The member to look up')
+async def show_strikes(interaction: discord.Interaction, member: str):
+    # Names are looked up in the member index; IDs (picked from the autocomplete) aren't
+    if not await ensure_ready(interaction, 'strikes', *(() if member.isdigit() else ('members',))):
+        return
+    try:
+        user_id = int(member)
+    except ValueError:
+        matches = get_member_index(interaction.guild_id).search(member, limit=1)
+        if not matches:
+            await interaction.response.send_message(f"No member found matching `{member}`.", ephemeral=True)
+            return
+        user_id = matches[0][0]
+    embed = discord.Embed(title="Strike Count", color=discord.Color.orange())
+    embed.add_field(name="User", value=f"<@{user_id}>", inline=True)
+    embed.add_field(name="Total Strikes", value=str(strikes.count(interaction.guild_id, user_id)), inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Lazy mode: shortest prefix worth a gateway member search, and how long to wait for more typing
+MEMBER_QUERY_MIN_LENGTH = 2
+MEMBER_QUERY_DEBOUNCE_SECONDS = 0.3
+# Latest autocomplete keystroke per (guild ID, user ID) waiting to search
+autocomplete_generations = {}
+
+# Suggest members by name or display name prefix
+@show_strikes.autocomplete('member')
+async def member_autocomplete(interaction: discord.Interaction, current: str):
+    await readiness.wait('members', interaction.guild_id, timeout=1)  # Suggest from a partial index rather than none
+    index = get_member_index(interaction.guild_id)
+    if args.lazy_members and not args.slim_members and len(current) >= MEMBER_QUERY_MIN_LENGTH and interaction.guild is not None:
+        # Search the gateway only once the user stops typing; superseded keystrokes answer from the index
+        key = (interaction.guild_id, interaction.user.id)
+        generation = autocomplete_generations[key] = autocomplete_generations.get(key, 0) + 1
+        await asyncio.sleep(MEMBER_QUERY_DEBOUNCE_SECONDS)
+        if autocomplete_generations.get(key) == generation:
+            del autocomplete_generations[key]
+            await query_members(interaction.guild, current)
+    return [app_commands.Choice(name=label[:100], value=str(member_id)) for member_id, label in index.search(current)]
+
+# Format a number of seconds as e.g. "1h 02m" or "45s"
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+# Background deletion of messages too old for bulk delete. Each channel with pending
+# messages gets its own worker; message deletes are rate limited per channel, so
+# discord.py's per-route Ratelimit paces each worker at its own bucket's rate and
+# no channel waits behind another. The queue is persisted, so restarts resume it.
+class DeletionQueue:
+    RETRIES = 5  # Attempts per message on Discord server errors before it is dropped
+
+    def __init__(self):
+        self.queues = {}  # Channel ID -> deque of message IDs
+        self.tasks = {}  # Channel ID -> worker task
+        self.deleted = {}  # Channel ID -> messages deleted since the channel was queued
+        self.started = {}  # Channel ID -> time the worker started
+        self.guilds = {}  # Channel ID -> guild ID, so status is only shown to the channel's own guild
+
+    async def start(self):
+        for channel_id, (guild_id, message_ids) in (await store.load_deletions()).items():
+            self.queues[channel_id] = deque(message_ids)
+            self.guilds[channel_id] = guild_id
+            self._ensure_worker(channel_id)
+        if self.queues:
+            print(f"Resuming background deletion of {self.pending()} message(s) in {len(self.queues)} channel(s).")
+
+    def pending(self, channel_id=None):
+        if channel_id is not None:
+            return len(self.queues.get(channel_id, ()))
+        return sum(len(queue) for queue in self.queues.values())
+
+    # Guild a queued channel belongs to; rows queued before guilds were stored are resolved from the cache
+    def guild_of(self, channel_id):
+        guild_id = self.guilds.get(channel_id)
+        if guild_id is None:
+            channel = bot.get_channel(channel_id)
+            guild_id = self.guilds[channel_id] = channel.guild.id if channel is not None else None
+        return guild_id
+
+    async def add(self, guild_id, channel_id, message_ids):
+        await store.add_deletions(guild_id, channel_id, message_ids)
+        self.guilds[channel_id] = guild_id
+        self.queues.setdefault(channel_id, deque()).extend(message_ids)
+        self._ensure_worker(channel_id)
+
+    def _ensure_worker(self, channel_id):
+        if channel_id not in self.tasks:
+            self.deleted.setdefault(channel_id, 0)
+            self.started.setdefault(channel_id, time.perf_counter())
+            self.tasks[channel_id] = asyncio.create_task(self._drain(channel_id))
+
+    async def _drain(self, channel_id):
+        queue = self.queues[channel_id]
+        channel = bot.get_partial_messageable(channel_id)
+        failures = 0
+        try:
+            while queue:
+                message_id = queue[0]
+                try:
+                    await channel.get_partial_message(message_id).delete()
+                except discord.NotFound as e:
+                    if e.code == 10003:  # Unknown Channel: nothing left to delete
+                        queue.clear()
+                        await store.remove_deletions(channel_id)
+                        break
+                    # Unknown Message: already gone, carry on
+                except discord.Forbidden:
+                    print(f"Lost permission to delete messages in channel {channel_id}; dropping {len(queue)} queued message(s).")
+                    queue.clear()
+                    await store.remove_deletions(channel_id)
+                    break
+                except discord.HTTPException as e:
+                    # Server errors may pass; other errors (an archived thread, a system message) never will
+                    failures += 1
+                    if e.status >= 500 and failures < self.RETRIES:
+                        print(f"Failed to delete message {message_id} in channel {channel_id}: {e}; retrying shortly.")
+                        await asyncio.sleep(5)
+                        continue
+                    print(f"Failed to delete message {message_id} in channel {channel_id}: {e}; dropping it.")
+                    queue.popleft()
+                    failures = 0
+                    await store.remove_deletions(channel_id, [message_id])
+                    continue
+                queue.popleft()
+                failures = 0
+                self.deleted[channel_id] += 1
+                await store.remove_deletions(channel_id, [message_id])
+        finally:
+            self.tasks.pop(channel_id, None)
+            if not queue:
+                self.queues.pop(channel_id, None)
+                print(f"Background deletion in channel {channel_id} finished: {self.deleted.pop(channel_id, 0)} message(s).")
+                self.started.pop(channel_id, None)
+                self.guilds.pop(channel_id, None)
+
+    # Stop the workers at shutdown; whatever is left stays in the store for the next run
+    def stop(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    # One line per channel of a guild with pending messages: progress, rate and ETA,
+    # plus the number of messages pending in those channels
+    def status_lines(self, guild_id):
+        lines = []
+        pending = 0
+        for channel_id, queue in self.queues.items():
+            if self.guild_of(channel_id) != guild_id:
+                continue
+            pending += len(queue)
+            elapsed = time.perf_counter() - self.started.get(channel_id, time.perf_counter())
+            deleted = self.deleted.get(channel_id, 0)
+            rate = deleted / elapsed if elapsed > 0 else 0
+            eta = f", about {format_duration(len(queue) / rate)} left" if rate > 0 else ""
+            lines.append(f"<#{channel_id}>: {deleted} deleted, {len(queue)} pending ({rate:.2f}/s{eta})")
+        return lines, pending
+
+deletion_queue = DeletionQueue()
+
+# Tracks a running purge and renders its progress, throughput and ETA
+class PurgeProgress:
+    def __init__(self, channel, before=None, after=None):
+        self.started = time.perf_counter()
+        # The time window being purged, newest edge first
+        self.now = before or discord.utils.utcnow()
+        self.channel_created = max(after, channel.created_at) if after else channel.created_at
+        self.scanned = 0
+        self.deleted = 0
+        self.queued = 0  # Messages handed to the background deletion queue
+        self.oldest = None  # Timestamp of the oldest message handled so far
+        self.last_report = self.started
+
+    def add(self, messages, queued=False):
+        if queued:
+            self.queued += len(messages)
         else:
-            print(f"Log channel with ID {LOG_CHANNEL_ID} not found. Cannot log strike.")
+            self.deleted += len(messages)
+        self.oldest = messages[-1].created_at
+
+    # History is deleted newest first, so the share of the channel's lifetime already
+    # covered is a cheap estimate of how far along the purge is
+    def eta(self, elapsed):
+        if self.oldest is None:
+            return None
+        covered = (self.now - self.oldest).total_seconds()
+        remaining = (self.oldest - self.channel_created).total_seconds()
+        if covered <= 0:
+            return None
+        return elapsed * remaining / covered
+
+    def render(self, done=False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.deleted / elapsed if elapsed > 0 else 0
+        queued = f" Queued {self.queued} message(s) older than 14 days for background deletion; see /nukestatus." if self.queued else ""
+        if done:
+            return f"Channel nuked! 💣 Deleted {self.deleted} message(s) in {format_duration(elapsed)} ({rate:.1f}/s).{queued}"
+        eta = self.eta(elapsed)
+        eta_text = f", about {format_duration(eta)} left" if eta is not None else ""
+        if self.scanned > self.deleted + self.queued:
+            eta_text += f", {self.scanned} scanned"
+        return f"Nuking… deleted {self.deleted} message(s) in {format_duration(elapsed)} ({rate:.1f}/s{eta_text}).{queued}"
+
+# Delete every message in a channel (or only those within before/after that pass
+# `check`): bulk-delete in batches of 100 while messages are younger than 14 days,
+# then hand the rest to the background deletion queue
+async def purge_channel(channel, progress, report, check=None, before=None, after=None):
+    cutoff = discord.utils.utcnow() - timedelta(days=14, minutes=-1)  # Small margin before the bulk-delete limit
+    batch = []
+    old = []
+    # before/after go into the history request, so only the requested window is fetched
+    async for message in channel.history(limit=None, before=before, after=after, oldest_first=False):
+        progress.scanned += 1
+        if check is not None and not check(message):
+            if progress.scanned % 100 == 0:
+                await report()
+            continue
+        if message.created_at > cutoff:
+            batch.append(message)
+            if len(batch) == 100:
+                await channel.delete_messages(batch)
+                progress.add(batch)
+                batch = []
+                await report()
+            continue
+        old.append(message)
+        if len(old) == 100:
+            await deletion_queue.add(channel.guild.id, channel.id, [m.id for m in old])
+            progress.add(old, queued=True)
+            old = []
+            await report()
+    if batch:
+        await channel.delete_messages(batch)
+        progress.add(batch)
+    if old:
+        await deletion_queue.add(channel.guild.id, channel.id, [m.id for m in old])
+        progress.add(old, queued=True)
+
+# Parse a /nuke time bound: a relative age like "30m", "2h" or "7d", or an ISO 8601 timestamp (UTC if no offset)
+def parse_time_bound(value):
+    match = re.fullmatch(r'\s*(\d+)\s*([smhdw])\s*', value.lower())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        seconds = amount * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}[unit]
+        return discord.utils.utcnow() - timedelta(seconds=seconds)
+    parsed = datetime.fromisoformat(value.strip())
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+# Build a predicate for the /nuke filters, or None when every message matches
+def build_message_filter(author=None, contains=None, regex=False, bots_only=False, attachments_only=False):
+    checks = []
+    if author is not None:
+        checks.append(lambda message: message.author.id == author.id)
+    if contains:
+        if regex:
+            pattern = re.compile(contains, re.IGNORECASE)
+            checks.append(lambda message: pattern.search(message.content) is not None)
+        else:
+            needle = contains.casefold()
+            checks.append(lambda message: needle in message.content.casefold())
+    if bots_only:
+        checks.append(lambda message: message.author.bot)
+    if attachments_only:
+        checks.append(lambda message: bool(message.attachments))
+    if not checks:
+        return None
+    return lambda message: all(check(message) for check in checks)
+
+# Estimate how many messages a channel holds from one page of history: the density of
+# the newest 100 messages extrapolated over the channel's lifetime
+async def estimate_message_count(channel):
+    page = [message async for message in channel.history(limit=100)]
+    if len(page) < 100:
+        return len(page)
+    span = (page[0].created_at - page[-1].created_at).total_seconds()
+    lifetime = (page[0].created_at - channel.created_at).total_seconds()
+    if span <= 0:
+        return NUKE_CLONE_THRESHOLD + 1  # 100 messages in the same instant: assume it's huge
+    return int(100 * lifetime / span)
+
+# Replace a channel with a fresh clone in the same spot, carrying over its webhooks.
+# clone() already copies the name, topic, category, slowmode, NSFW flag and permission overwrites.
+async def replace_channel(channel, reason):
+    clone = await channel.clone(reason=reason)
+    moved = []
+    try:
+        await clone.edit(position=channel.position, reason=reason)
+        for webhook in await channel.webhooks():
+            await webhook.edit(channel=clone, reason=reason)  # Moving keeps the webhook's URL working
+            moved.append(webhook)
+        await channel.delete(reason=reason)
+    except discord.HTTPException:
+        # Roll back so the guild keeps just the original channel with its webhooks
+        for webhook in moved:
+            try:
+                await webhook.edit(channel=channel, reason=f"{reason} (rolled back)")
+            except discord.HTTPException as e:
+                print(f"Failed to move webhook {webhook.id} back to channel {channel.id}: {e}")
+        try:
+            await clone.delete(reason=f"{reason} (rolled back)")
+        except discord.HTTPException as e:
+            print(f"Failed to delete clone {clone.id} of channel {channel.id}: {e}")
+        raise
+    return clone
+
+# Nuke by replacing the channel with a clone, reporting through the command's response
+async def clone_nuke(interaction, channel):
+    started = time.perf_counter()
+    try:
+        clone = await replace_channel(channel, reason=f"Nuked by {interaction.user}")
+    except discord.HTTPException as e:
+        print(f"Failed to replace channel {channel.id}: {e}")
+        try:
+            await interaction.edit_original_response(content=f"Couldn't replace the channel ({e}); it was left as it was.", embed=None, view=None)
+        except discord.HTTPException:
+            pass
+        return
+    print(f"Nuked channel {channel.id} by replacing it with {clone.id} in {time.perf_counter() - started:.2f}s.")
+    # Keep logging strikes if the replaced channel was the guild's log channel
+    config = get_guild_config(channel.guild.id)
+    if config.log_channel_id == channel.id:
+        config = GuildConfig(config.guild_id, clone.id, config.strike_threshold, config.punishment, config.strike_expiry_days)
+        await store.save_guild_config(config)
+        guild_configs[config.guild_id] = config
+    try:
+        await interaction.edit_original_response(content=f"Channel nuked! 💣 Replaced it with {clone.mention}.", embed=None, view=None)
+    except discord.HTTPException:
+        pass  # The response lived in the deleted channel
+
+# Nuke by purging messages, editing the command's response with progress as it goes
+async def purge_nuke(interaction, channel, check=None, before=None, after=None):
+    progress = PurgeProgress(channel, before=before, after=after)
+
+    async def report():
+        now = time.perf_counter()
+        if now - progress.last_report < NUKE_PROGRESS_SECONDS:
+            return
+        progress.last_report = now
+        try:
+            await interaction.edit_original_response(content=progress.render(), embed=None, view=None)
+        except discord.HTTPException:
+            pass  # The interaction token expires after 15 minutes; keep purging regardless
+
+    try:
+        await purge_channel(channel, progress, report, check=check, before=before, after=after)
+    except discord.HTTPException as e:
+        print(f"Nuke of channel {channel.id} stopped after {progress.deleted} message(s): {e}")
+        await interaction.followup.send(f"Nuke stopped after {progress.deleted} message(s): {e}", ephemeral=True)
+        return
+    print(f"Nuked channel {channel.id}: {progress.render(done=True)}")
+    try:
+        await interaction.edit_original_response(content=progress.render(done=True), embed=None, view=None)
+    except discord.HTTPException:
+        pass
+
+# Count the messages a nuke would remove without deleting anything, split into
+# bulk-deletable and older messages. Scans at most NUKE_DRY_RUN_LIMIT messages and
+# extrapolates the rest from the message rate over the part of the window it covered.
+async def count_nuke_targets(channel, check=None, before=None, after=None):
+    newest = before or discord.utils.utcnow()
+    lowest = max(after, channel.created_at) if after else channel.created_at
+    cutoff = discord.utils.utcnow() - timedelta(days=14, minutes=-1)
+    counts = {'scanned': 0, 'total': 0, 'bulk': 0, 'old': 0, 'complete': True}
+    oldest = newest
+    async for message in channel.history(limit=None, before=before, after=after, oldest_first=False):
+        if counts['scanned'] >= NUKE_DRY_RUN_LIMIT:
+            counts['complete'] = False
+            break
+        counts['scanned'] += 1
+        oldest = message.created_at
+        if check is None or check(message):
+            counts['bulk' if message.created_at > cutoff else 'old'] += 1
+
+    if not counts['complete']:
+        # Matches per second in each part of the window that was scanned, applied to the part that wasn't
+        bulk_start = max(cutoff, lowest)
+        scanned_bulk = (newest - max(oldest, bulk_start)).total_seconds()
+        if oldest > bulk_start:
+            rate = counts['bulk'] / scanned_bulk if scanned_bulk > 0 else 0
+            counts['bulk'] += int(rate * (oldest - bulk_start).total_seconds())
+            counts['old'] = int(rate * max((min(cutoff, newest) - lowest).total_seconds(), 0))
+        else:
+            scanned_old = (min(cutoff, newest) - oldest).total_seconds()
+            rate = counts['old'] / scanned_old if scanned_old > 0 else 0
+            counts['old'] += int(rate * (oldest - lowest).total_seconds())
+        # Every message in the window is listed, matching or not
+        scanned_span = (newest - oldest).total_seconds()
+        window = (newest - lowest).total_seconds()
+        counts['total'] = int(counts['scanned'] * window / scanned_span) if scanned_span > 0 else counts['scanned']
+    else:
+        counts['total'] = counts['scanned']
+    return counts
+
+# Estimated wall time of each nuke path from the known per-route rate limits
+def estimate_nuke_seconds(counts):
+    listing = -(-counts['total'] // 100) * NUKE_HISTORY_PAGE_SECONDS  # History pages over the whole window
+    bulk = -(-counts['bulk'] // 100) * NUKE_BULK_DELETE_SECONDS
+    old = counts['old'] * NUKE_SINGLE_DELETE_SECONDS
+    return listing + bulk, old
+
+# Render a dry-run result as an embed for the confirmation view
+def render_nuke_estimate(counts, can_clone):
+    prefix = "" if counts['complete'] else "~"
+    purge_seconds, background_seconds = estimate_nuke_seconds(counts)
+    embed = discord.Embed(title="Nuke Dry Run", color=discord.Color.orange())
+    embed.add_field(name="Bulk-deletable", value=f"{prefix}{counts['bulk']}", inline=True)
+    embed.add_field(name="Older than 14 days", value=f"{prefix}{counts['old']}", inline=True)
+    embed.add_field(name="Purge time", value=f"~{format_duration(purge_seconds)}, then ~{format_duration(background_seconds)} in the background", inline=False)
+    if can_clone:
+        embed.add_field(name="Clone time", value="a few seconds, regardless of size", inline=False)
+    if not counts['complete']:
+        embed.set_footer(text=f"Estimated from the newest {counts['scanned']} messages.")
+    return embed
+
+# A view with buttons for choosing how to run a nuke after a dry run
+class ConfirmNukeView(View):
+    def __init__(self, interaction, channel, can_clone, check, before, after):
+        super().__init__()
+        self.interaction = interaction
+        self.channel = channel
+        self.can_clone = can_clone
+        self.check = check
+        self.before = before
+        self.after = after
+        if not can_clone:
+            self.remove_item(self.clone)
+
+    @discord.ui.button(label="Purge", style=discord.ButtonStyle.danger)
+    async def purge(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user == self.interaction.user:
+            self.stop()
+            await interaction.response.edit_message(content="Nuking…", embed=None, view=None)
+            await purge_nuke(self.interaction, self.channel, self.check, self.before, self.after)
+        else:
+            await interaction.response.send_message("You cannot confirm this nuke.", ephemeral=True)
+
+    @discord.ui.button(label="Clone and replace", style=discord.ButtonStyle.danger)
+    async def clone(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user == self.interaction.user:
+            self.stop()
+            await interaction.response.edit_message(content="Nuking…", embed=None, view=None)
+            await clone_nuke(self.interaction, self.channel)
+        else:
+            await interaction.response.send_message("You cannot confirm this nuke.", ephemeral=True)
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user == self.interaction.user:
+            self.stop()
+            await interaction.response.edit_message(content="Nuke canceled.", embed=None, view=None)
+        else:
+            await interaction.response.send_message("You cannot cancel this nuke.", ephemeral=True)
+
+# Slash command to show or change this guild's strike settings
+@bot.tree.command(name='strikeconfig', description="Shows or changes this server's strike settings.")
+@app_commands.describe(
+    log_channel='Channel where strikes are logged',
+    threshold='Number of strikes that asks for confirmation before punishing',
+    punishment='What happens when a strike at the threshold is confirmed',
+    expiry_days='Days before a strike expires (0 keeps strikes forever)'
+)
+@app_commands.choices(punishment=[app_commands.Choice(name=name, value=value) for value, name in PUNISHMENTS.items()])
+@app_commands.checks.has_permissions(manage_guild=True)
+async def strikeconfig(interaction: discord.Interaction, log_channel: discord.TextChannel = None,
+                       threshold: app_commands.Range[int, 1, 100] = None,
+                       punishment: app_commands.Choice[str] = None,
+                       expiry_days: app_commands.Range[int, 0, 3650] = None):
+    config = get_guild_config(interaction.guild_id)
+    if log_channel is not None or threshold is not None or punishment is not None or expiry_days is not None:
+        previous = config
+        config = GuildConfig(
+            interaction.guild_id,
+            log_channel.id if log_channel is not None else config.log_channel_id,
+            threshold if threshold is not None else config.strike_threshold,
+            punishment.value if punishment is not None else config.punishment,
+            expiry_days if expiry_days is not None else config.strike_expiry_days,
+        )
+        await store.save_guild_config(config)
+        guild_configs[interaction.guild_id] = config  # Replace the cached settings
+        if config.strike_expiry_days != previous.strike_expiry_days:
+            await strikes.load(interaction.guild_id)  # Strikes that had expired may be active again, or the other way round
+    embed = discord.Embed(title="Strike Settings", color=discord.Color.orange())
+    embed.add_field(name="Log Channel", value=f"<#{config.log_channel_id}>" if config.log_channel_id else "Not set", inline=True)
+    embed.add_field(name="Threshold", value=str(config.strike_threshold), inline=True)
+    embed.add_field(name="Punishment", value=PUNISHMENTS[config.punishment], inline=True)
+    embed.add_field(name="Strikes Expire", value=f"After {config.strike_expiry_days} day(s)" if config.strike_expiry_days else "Never", inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Slash command to delete all messages in the current channel
 @bot.tree.command(name='nuke', description='Deletes all messages in the current channel.')
+@app_commands.describe(
+    mode='Purge message by message, replace the channel with a clone, or pick automatically',
+    author='Only delete messages from this user',
+    after='Only delete messages newer than this, e.g. 1h, 30m, 7d or an ISO timestamp',
+    before='Only delete messages older than this, e.g. 1h, 30m, 7d or an ISO timestamp',
+    contains='Only delete messages containing this text',
+    regex='Treat "contains" as a regular expression',
+    bots_only='Only delete messages sent by bots',
+    attachments_only='Only delete messages with attachments',
+    dry_run='Count what would be deleted and estimate the time before choosing how to proceed'
+)
+@app_commands.choices(mode=[
+    app_commands.Choice(name='Automatic', value='auto'),
+    app_commands.Choice(name='Purge messages', value='purge'),
+    app_commands.Choice(name='Clone and replace the channel', value='clone'),
+])
+@app_commands.checks.has_permissions(manage_messages=True)
+async def nuke(interaction: discord.Interaction, mode: app_commands.Choice[str] = None,
+               author: discord.User = None, after: str = None, before: str = None,
+               contains: str = None, regex: bool = False,
+               bots_only: bool = False, attachments_only: bool = False, dry_run: bool = False):
+    try:
+        after_time = parse_time_bound(after) if after else None
+        before_time = parse_time_bound(before) if before else None
+        check = build_message_filter(author, contains, regex, bots_only, attachments_only)
+    except (ValueError, OverflowError, re.error) as e:
+        await interaction.response.send_message(f"Invalid filter: {e}", ephemeral=True)
+        return
+
+    # Acknowledge right away; a full purge takes far longer than the interaction deadline
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    channel = interaction.channel
+    mode = mode.value if mode else 'auto'
+    filtered = check is not None or after_time is not None or before_time is not None
+
+    # Cloning needs Manage Channels and Manage Webhooks for both the moderator and the bot.
+    # A Community guild's rules and updates channels can't be deleted, so they're only purged.
+    can_clone = (isinstance(channel, discord.TextChannel)
+                 and channel not in (channel.guild.rules_channel, channel.guild.public_updates_channel)
+                 and interaction.permissions.manage_channels and interaction.app_permissions.manage_channels
+                 and interaction.app_permissions.manage_webhooks)
+    if mode == 'clone' and filtered:
+        await interaction.followup.send("Filters only work when purging; cloning always removes every message.", ephemeral=True)
+        return
+    if mode == 'clone' and not can_clone:
+        await interaction.followup.send("This channel can't be cloned; it needs Manage Channels and Manage Webhooks, "
+                                        "and can't be the server's rules or updates channel.", ephemeral=True)
+        return
+    if dry_run:
+        counts = await count_nuke_targets(channel, check=check, before=before_time, after=after_time)
+        view = ConfirmNukeView(interaction, channel, can_clone and not filtered, check, before_time, after_time)
+        await interaction.edit_original_response(embed=render_nuke_estimate(counts, view.can_clone), view=view)
+        return
+    if mode == 'auto' and can_clone and not filtered:
+        estimate = await estimate_message_count(channel)
+        if estimate > NUKE_CLONE_THRESHOLD:
+            print(f"Channel {channel.id} has about {estimate} messages; replacing it with a clone.")
+            mode = 'clone'
+    if mode == 'clone':
+        await clone_nuke(interaction, channel)
+    else:
+        await purge_nuke(interaction, channel, check, before_time, after_time)
+
+# Slash command to show the background deletion queue
+@bot.tree.command(name='nukestatus', description='Shows the progress of background message deletion.')
 @app_commands.checks.has_permissions(manage_messages=True)
-async def nuke(interaction: discord.Interaction):
-    await interaction.channel.purge()
-    await interaction.response.send_message("Channel nuked! 💣", ephemeral=True)
+async def nukestatus(interaction: discord.Interaction):
+    lines, pending = deletion_queue.status_lines(interaction.guild_id)
+    if not lines:
+        await interaction.response.send_message("No background deletions are running.", ephemeral=True)
+        return
+    embed = discord.Embed(title="Background Deletion", description='\n'.join(lines)[:4000], color=discord.Color.red())
+    embed.set_footer(text=f"{pending} message(s) pending in {len(lines)} channel(s)")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Slash command to repeat a user's message as an embed with the author's name and avatar
 @bot.tree.command(name='say', description='Repeats your input as an embed.')
@@ -177,6 +2151,20 @@ async def sayraw(interaction: discord.Interaction, message: str):
     embed = discord.Embed(description=message, color=discord.Color.green())
     await interaction.response.send_message(embed=embed)
 
+# Persistent view attached to reaction-role panels in "button" feedback mode
+class ReactionRolesView(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="My roles", style=discord.ButtonStyle.secondary, custom_id="reaction_roles:mine")
+    async def my_roles(self, interaction: discord.Interaction, button: discord.ui.Button):
+        mapping = reaction_roles.get(interaction.message.id, {})
+        held = [f"<@&{role_id}>" for role_id in mapping.values() if interaction.user.get_role(role_id)]
+        if held:
+            await interaction.response.send_message(f"Your roles from this panel: {', '.join(held)}", ephemeral=True)
+        else:
+            await interaction.response.send_message("You have no roles from this panel.", ephemeral=True)
+
 # Slash command to set up reaction roles
 @bot.tree.command(name='setupreactionroles', description='Set up reaction roles with emojis and roles.')
 @app_commands.describe(
@@ -186,8 +2174,15 @@ async def sayraw(interaction: discord.Interaction, message: str):
     emoji4='Fourth emoji', role4='Fourth role',
     emoji5='Fifth emoji', role5='Fifth role',
     emoji6='Sixth emoji', role6='Sixth role',
-    emoji7='Seventh emoji', role7='Seventh role'
+    emoji7='Seventh emoji', role7='Seventh role',
+    feedback='How members are told about role changes (default: none)'
 )
+@app_commands.choices(feedback=[
+    app_commands.Choice(name='None', value='none'),
+    app_commands.Choice(name='Batched digest in the channel', value='digest'),
+    app_commands.Choice(name='Direct message', value='dm'),
+    app_commands.Choice(name='"My roles" button with a private reply', value='button'),
+])
 async def setupreactionroles(interaction: discord.Interaction,
                              emoji1: str, role1: discord.Role,
                              emoji2: str = None, role2: discord.Role = None,
@@ -195,7 +2190,8 @@ async def setupreactionroles(interaction: discord.Interaction,
                              emoji4: str = None, role4: discord.Role = None,
                              emoji5: str = None, role5: discord.Role = None,
                              emoji6: str = None, role6: discord.Role = None,
-                             emoji7: str = None, role7: discord.Role = None):
+                             emoji7: str = None, role7: discord.Role = None,
+                             feedback: app_commands.Choice[str] = None):
     # Create a list of tuples (emoji, role) based on the provided arguments
     roles = [(emoji1, role1), (emoji2, role2), (emoji3, role3), (emoji4, role4), 
              (emoji5, role5), (emoji6, role6), (emoji7, role7)]
@@ -209,64 +2205,295 @@ async def setupreactionroles(interaction: discord.Interaction,
         embed.add_field(name="\u200b", value=f"{emoji} : {role.mention}", inline=False)
 
     # Send the embed message
-    message = await interaction.response.send_message(embed=embed)
+    mode = feedback.value if feedback else 'none'
+    if mode == 'button':
+        await interaction.response.send_message(embed=embed, view=ReactionRolesView())
+    else:
+        await interaction.response.send_message(embed=embed)
     message = await interaction.original_response()  # Fetch the original message
     
-    # Add reactions to the message and update the reaction_roles dictionary
+    # Add reactions to the message and collect the emojis that worked
+    mapping = {}
     for emoji, role in roles:
         try:
             await message.add_reaction(emoji)
-            # Map the message ID to the role configuration
-            if message.id not in reaction_roles:
-                reaction_roles[message.id] = {}
-            reaction_roles[message.id][emoji] = role
+            mapping[emoji_key(emoji)] = role.id
         except discord.HTTPException:
             await interaction.followup.send(f"Failed to add reaction: {emoji}", ephemeral=True)
 
-# Event listener for on_reaction_add
+    # Map the message ID to the role configuration and persist it
+    if mapping:
+        reaction_roles[message.id] = mapping
+        panel_feedback[message.id] = mode
+        await store.add_reaction_roles(interaction.guild_id, message.id, mapping, mode)
+
+# Forget reaction-role panels whose message was deleted
 @bot.event
-async def on_reaction_add(reaction, user):
-    if user.bot:
-        return  # Ignore reactions from bots
-    
-    # Check if the reaction is in the reaction_roles mapping
-    if reaction.message.id in reaction_roles:
-        role = reaction_roles[reaction.message.id].get(str(reaction.emoji))
-        if role:
-            try:
-                await user.add_roles(role)
-                # Send an ephemeral message confirming the role assignment
-                await reaction.message.channel.send(
-                    f"Assigned {role.mention} to {user.mention}", 
-                    delete_after=5, 
-                    ephemeral=True
-                )
-            except discord.Forbidden:
-                print(f"Missing permissions to add role {role.name} to {user.name}")
+async def on_raw_message_delete(payload):
+    panel_feedback.pop(payload.message_id, None)
+    if reaction_roles.pop(payload.message_id, None) is not None:
+        await store.delete_reaction_roles(message_ids=[payload.message_id])
 
-# Event listener for on_reaction_remove
 @bot.event
-async def on_reaction_remove(reaction, user):
-    if user.bot:
-        return  # Ignore reactions from bots
-    
-    # Check if the reaction is in the reaction_roles mapping
-    if reaction.message.id in reaction_roles:
-        role = reaction_roles[reaction.message.id].get(str(reaction.emoji))
-        if role:
-            try:
-                await user.remove_roles(role)
-                # Send an ephemeral message confirming the role removal
-                await reaction.message.channel.send(
-                    f"Removed {role.mention} from {user.mention}", 
-                    delete_after=5, 
-                    ephemeral=True
-                )
-            except discord.Forbidden:
-                print(f"Missing permissions to remove role {role.name} from {user.name}")
+async def on_raw_bulk_message_delete(payload):
+    deleted = [message_id for message_id in payload.message_ids if reaction_roles.pop(message_id, None) is not None]
+    for message_id in deleted:
+        panel_feedback.pop(message_id, None)
+    if deleted:
+        await store.delete_reaction_roles(message_ids=deleted)
+
+# Forget reaction-role entries that point at a deleted role
+@bot.event
+async def on_guild_role_delete(role):
+    found = False
+    for mapping in reaction_roles.values():
+        for key in [key for key, role_id in mapping.items() if role_id == role.id]:
+            del mapping[key]
+            found = True
+    if found:
+        await store.delete_reaction_roles(role_ids=[role.id])
+
+# Normalize an emoji to the key used in reaction_roles: the ID for custom emojis, else the character
+def emoji_key(emoji):
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return str(emoji.id) if emoji.id else emoji.name
+
+# Pending reaction-role changes per member: (guild ID, member ID) -> {role ID: True to add, False to remove},
+# plus the newest Member received with a reaction, if any
+pending_role_changes = {}
+# Flush tasks for the pending changes, kept so they aren't garbage collected
+role_flush_tasks = {}
+
+# Queue a role change and start the member's debounce window if it isn't running yet
+def queue_role_change(guild, member_id, role_id, add, channel_id, message_id, member=None):
+    key = (guild.id, member_id)
+    pending = pending_role_changes.setdefault(key, {'roles': {}})
+    pending['roles'][role_id] = add  # The latest click for a role wins
+    pending['channel_id'] = channel_id
+    pending['message_id'] = message_id
+    if member is not None:
+        pending['member'] = member
+    if key not in role_flush_tasks:
+        role_flush_tasks[key] = asyncio.create_task(flush_role_changes(guild, member_id))
+
+# Apply every change queued during the debounce window with a single member edit. The task
+# stays registered until its edit returns, so clicks made meanwhile open the next window in
+# the same task: one edit per member at a time, each starting from the roles the last one set.
+async def flush_role_changes(guild, member_id):
+    key = (guild.id, member_id)
+    edited = None
+    try:
+        while key in pending_role_changes:
+            await asyncio.sleep(ROLE_DEBOUNCE_SECONDS)
+            pending = pending_role_changes.pop(key)
+            edited = await apply_role_changes(guild, member_id, pending, pending.get('member') or edited)
+            if key in pending_role_changes:
+                pending_role_changes[key].pop('member', None)  # Received before this edit returned
+    finally:
+        role_flush_tasks.pop(key, None)
+
+# Apply one batch of queued changes and return the edited Member, if there is one. A full
+# role list is only sent when it comes from a fresh source: the reaction's or the last
+# edit's Member, the gateway cache, or the slim-mode index (both kept current by
+# GUILD_MEMBER_UPDATE). Members from the lazy-mode LRU may be stale, so they get per-role calls.
+async def apply_role_changes(guild, member_id, pending, user=None):
+    user = user or guild.get_member(member_id)
+    if user is None and args.slim_members:
+        record = get_member_index(guild.id).get(member_id)
+        if record is not None:
+            return await flush_indexed_role_changes(guild, record, pending)
+    if user is None:
+        user = await get_member(guild, member_id)
+        if user is not None and not user.bot:
+            return await flush_role_changes_per_role(guild, user, pending)
+    if user is None or user.bot:
+        return None  # Ignore members who left and reactions from bots
+    current = {role.id for role in user.roles}
+    added = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if add and role_id not in current]
+    removed = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if not add and role_id in current]
+    added = [role for role in added if role is not None]
+    removed = [role for role in removed if role is not None]
+    if not added and not removed:
+        return user  # Net no-op, e.g. a role toggled on and off again
+
+    roles = [role for role in user.roles if not role.is_default() and role not in removed] + added
+    try:
+        edited = await user.edit(roles=roles, reason='Reaction roles')
+    except discord.Forbidden:
+        print(f"Missing permissions to update roles for {user.name}")
+        return None
+    if edited is not None and (args.lazy_members or args.slim_members):
+        member_cache.put(edited)
+    await send_role_feedback(pending['message_id'], pending['channel_id'], user, added, removed)
+    return edited
+
+# Lazy mode: add and remove each role on its own, leaving roles given since the member was
+# cached untouched. Both calls are no-ops for roles the member already has or lacks.
+async def flush_role_changes_per_role(guild, user, pending):
+    added = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if add]
+    removed = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if not add]
+    added = [role for role in added if role is not None]
+    removed = [role for role in removed if role is not None]
+    try:
+        for role in added:
+            await bot.http.add_role(guild.id, user.id, role.id, reason='Reaction roles')
+        for role in removed:
+            await bot.http.remove_role(guild.id, user.id, role.id, reason='Reaction roles')
+    except discord.NotFound:
+        return None
+    except discord.Forbidden:
+        print(f"Missing permissions to update roles for {user.name}")
+        return None
+    finally:
+        member_cache.discard(guild.id, user.id)  # Its roles no longer match
+    await send_role_feedback(pending['message_id'], pending['channel_id'], user, added, removed)
+    return None
+
+# Slim mode: apply queued changes from a member's index record, with no member fetch
+async def flush_indexed_role_changes(guild, record, pending):
+    if record.bot:
+        return
+    current = set(record.role_ids)
+    added = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if add and role_id not in current]
+    removed = [guild.get_role(role_id) for role_id, add in pending['roles'].items() if not add and role_id in current]
+    added = [role for role in added if role is not None]
+    removed = [role for role in removed if role is not None]
+    if not added and not removed:
+        return
+
+    roles = (current - {role.id for role in removed}) | {role.id for role in added}
+    try:
+        # The same request Member.edit makes, without needing a Member to call it on
+        data = await bot.http.edit_member(guild.id, record.id, roles=[str(role_id) for role_id in roles], reason='Reaction roles')
+    except discord.NotFound:
+        get_member_index(guild.id).remove(record.id)
+        return
+    except discord.Forbidden:
+        print(f"Missing permissions to update roles for {record.name}")
+        return
+    get_member_index(guild.id).add(MemberRecord.from_data(data))
+    user = discord.Member(data=data, guild=guild, state=bot._connection)
+    await send_role_feedback(pending['message_id'], pending['channel_id'], user, added, removed)
+
+# Digest lines waiting to be posted per channel, and the tasks that will post them
+role_digests = {}
+role_digest_tasks = {}
+
+# Post a channel's collected role changes as a single message
+async def flush_role_digest(channel_id):
+    try:
+        await asyncio.sleep(ROLE_DIGEST_SECONDS)
+    finally:
+        role_digest_tasks.pop(channel_id, None)
+        lines = role_digests.pop(channel_id)
+
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        return
+    text = ''
+    for i, line in enumerate(lines):
+        if len(text) + len(line) > 1900:
+            text += f"…and {len(lines) - i} more change(s)"
+            break
+        text += line + '\n'
+    try:
+        await channel.send(text, delete_after=ROLE_DIGEST_SECONDS, allowed_mentions=discord.AllowedMentions.none())
+    except discord.HTTPException as e:
+        print(f"Failed to post reaction-role digest in channel {channel_id}: {e}")
+
+# Tell a member about their role changes according to the panel's feedback mode
+async def send_role_feedback(message_id, channel_id, user, added, removed):
+    mode = panel_feedback.get(message_id, 'none')
+    if mode in ('none', 'button'):
+        return  # Nothing to send; "button" panels answer on demand
+    lines = []
+    if added:
+        lines.append(f"Assigned {', '.join(role.mention for role in added)} to {user.mention}")
+    if removed:
+        lines.append(f"Removed {', '.join(role.mention for role in removed)} from {user.mention}")
+    if mode == 'digest':
+        role_digests.setdefault(channel_id, []).extend(lines)
+        if channel_id not in role_digest_tasks:
+            role_digest_tasks[channel_id] = asyncio.create_task(flush_role_digest(channel_id))
+    elif mode == 'dm':
+        guild_name = user.guild.name
+        names = [f"Assigned: {', '.join(role.name for role in added)}"] if added else []
+        names += [f"Removed: {', '.join(role.name for role in removed)}"] if removed else []
+        try:
+            await user.send(f"Your roles in {guild_name} were updated. " + ' · '.join(names))
+        except discord.HTTPException:
+            pass  # DMs closed; nothing else to do
+
+# Event listener for raw reaction adds, which fire even if the message isn't cached
+@bot.event
+async def on_raw_reaction_add(payload):
+    if payload.guild_id is None or payload.message_id not in reaction_roles:
+        return
+    role_id = reaction_roles[payload.message_id].get(emoji_key(payload.emoji))
+    user = payload.member
+    if role_id is None or user is None or user.bot:
+        return  # Ignore unmapped emojis and reactions from bots
+    queue_role_change(user.guild, user.id, role_id, True, payload.channel_id, payload.message_id, member=user)
+
+# Event listener for raw reaction removes, which fire even if the message isn't cached
+@bot.event
+async def on_raw_reaction_remove(payload):
+    if payload.guild_id is None or payload.message_id not in reaction_roles:
+        return
+    role_id = reaction_roles[payload.message_id].get(emoji_key(payload.emoji))
+    guild = bot.get_guild(payload.guild_id)
+    if role_id is None or guild is None:
+        return
+    # Removal payloads carry no member; it is resolved when the batch is flushed
+    queue_role_change(guild, payload.user_id, role_id, False, payload.channel_id, payload.message_id)
+
+# Start one bot process per shard range and wait for them all to exit
+def run_cluster(processes, shard_count):
+    per_process = -(-shard_count // processes)
+    children = []
+    for first in range(0, shard_count, per_process):
+        last = min(first + per_process, shard_count) - 1
+        command = [sys.executable, os.path.abspath(__file__), '--shard-count', str(shard_count), '--shard-ids', f'{first}-{last}']
+        if args.lazy_members:
+            command.append('--lazy-members')
+        if args.slim_members:
+            command.append('--slim-members')
+        if args.force_sync and first == 0:
+            command.append('--force-sync')
+        if args.record_gateway:
+            # One recording per process, e.g. shards0-3-gateway.jsonl.gz
+            directory, name = os.path.split(args.record_gateway)
+            command += ['--record-gateway', os.path.join(directory, f'shards{first}-{last}-{name}')]
+            if args.record_events:
+                command += ['--record-events', args.record_events]
+        env = dict(os.environ)
+        if METRICS_PORT:
+            env['METRICS_PORT'] = str(METRICS_PORT + len(children))  # One metrics port per process
+        if STARTUP_PROFILE_PATH:
+            # One startup profile per process, e.g. shards0-3-startup_profile.json
+            directory, name = os.path.split(STARTUP_PROFILE_PATH)
+            env['STARTUP_PROFILE_PATH'] = os.path.join(directory, f'shards{first}-{last}-{name}')
+        print(f'Starting shards {first}-{last} of {shard_count}.')
+        children.append(subprocess.Popen(command, env=env))
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for child in children:
+            if child.poll() is None:
+                child.send_signal(signal.SIGINT)  # Lets each bot drain its queues and close cleanly
+        for child in children:
+            child.wait()
 
 # Run the bot with the token
-if TOKEN:
+if TOKEN and args.cluster:
+    run_cluster(args.cluster, args.shard_count or args.cluster)
+elif TOKEN:
+    startup.mark('init')
     bot.run(TOKEN)
+    store.close()  # Checkpoint the WAL once the event loop has stopped
 else:
     print("DISCORD_TOKEN not found in the environment variables.")
@@ -0,0 +1,154 @@
+# Replay a gateway recording (main.py --record-gateway) into the bot.
+#
+# Every recorded dispatch is fed to the real bot's ConnectionState parsers in order,
+# 1x or N times faster than it was recorded (or as fast as possible), while the bot
+# talks to fake_discord's local REST server. The leading READY/GUILD_CREATE burst is
+# applied up front without timing. Reports handler latency per dispatch type, how far
+# the replay fell behind its schedule, and the REST calls and 429s it produced.
+#
+# Reaction roles, guild settings and strikes come from BOT_DB_PATH, so replay against a
+# copy of the production database to exercise the same panels (the copy is written to):
+#   BOT_DB_PATH=/tmp/bot-copy.db python replay_gateway.py gateway.jsonl.gz --speed 10
+import sys
+import gzip
+import zlib
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+
+import bench_load  # Sets up a throwaway environment for main before importing it
+import main
+from fake_discord import FakeDiscord, DispatchTracker, percentiles
+
+# Connection-level dispatches that need a live websocket; READY is only used for the bot's identity
+SKIPPED = {'READY', 'RESUMED'}
+SETUP = {'READY', 'GUILD_CREATE', 'GUILD_MEMBERS_CHUNK'}
+
+# Every dispatch in a recording. A recording cut off by a crash ends in an unfinished gzip
+# member; everything before it is kept and the truncated tail is reported and skipped.
+def load_recording(path):
+    records = []
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    records.append(json.loads(line))
+    except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError) as e:
+        print(f"Warning: {path} ends in a truncated or damaged block ({e}); replaying the {len(records)} dispatch(es) before it.")
+    return records
+
+def parse_speed(value):
+    return None if value == 'max' else float(value)
+
+async def replay(events, fake, tracker, speed, max_gap):
+    state = main.bot._connection
+    latencies = defaultdict(list)  # Dispatch type -> seconds until its handlers finished
+    lags = []
+    pending = set()
+    started = target = time.perf_counter()
+    previous = None
+
+    def finished(future, event, dispatched):
+        pending.discard(future)
+        latencies[event].append(time.perf_counter() - dispatched)
+
+    for record in events:
+        event, data = record['t'], record['d']
+        if speed is not None and previous is not None:
+            # Gaps between appended sessions are capped rather than replayed
+            target += min(max(record['ts'] - previous, 0), max_gap) / speed
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.001:
+                lags.append(-delay)  # More than a millisecond late
+        else:
+            await asyncio.sleep(0)  # Let handlers run between dispatches, as the gateway reader does
+        previous = record['ts']
+
+        fake.observe(event, data)
+        dispatched = time.perf_counter()
+        tasks = tracker.dispatch(state, event, data)
+        if tasks:
+            future = asyncio.gather(*tasks, return_exceptions=True)
+            pending.add(future)
+            future.add_done_callback(lambda future, event=event, dispatched=dispatched: finished(future, event, dispatched))
+
+    while pending:
+        await asyncio.gather(*list(pending))
+    for tasks in (main.role_flush_tasks, main.role_digest_tasks, main.log_publisher.tasks, main.deletion_queue.tasks):
+        await bench_load.wait_for_tasks(tasks)
+    return latencies, lags, time.perf_counter() - started
+
+async def run(options):
+    events = load_recording(options.recording)
+    if not events:
+        print(f"{options.recording} has no dispatches.")
+        return
+    split = next((i for i, record in enumerate(events) if record['t'] not in SETUP), len(events))
+    setup, timed = events[:split], [record for record in events[split:] if record['t'] not in SKIPPED]
+
+    fake = await FakeDiscord(window_scale=options.window_scale, shared_429_rate=options.shared_429_rate,
+                             latency=options.latency / 1000).start()
+    for record in setup:
+        if record['t'] == 'READY':
+            fake.bot_user = record['d']['user']
+            fake.app_id = int(record['d']['application']['id'])
+    fake.install()
+    tracker = DispatchTracker(asyncio.get_running_loop())
+    bot = main.bot
+    try:
+        async with bot:
+            await bot.login('replay')  # Runs main.setup_hook against the fake
+            state = bot._connection
+            state._chunk_guilds = False  # Chunking needs a websocket; recorded chunks are replayed instead
+            for record in setup:
+                fake.observe(record['t'], record['d'])
+                if record['t'] not in SKIPPED:
+                    state.parsers[record['t']](record['d'])
+            for guild in bot.guilds:
+                if main.args.slim_members:
+                    recorded = [member for (guild_id, _), member in fake.members.items() if guild_id == guild.id]
+                    main.get_member_index(guild.id).rebuild(main.MemberRecord.from_data(member) for member in recorded)
+                else:
+                    main.get_member_index(guild.id).rebuild(guild.members)
+            print(f"Applied {len(setup)} setup dispatch(es) for {len(bot.guilds)} guild(s); replaying {len(timed)} "
+                  f"at {'max speed' if options.speed == 'max' else options.speed + 'x'}.")
+
+            fake.reset_counters()
+            latencies, lags, elapsed = await replay(timed, fake, tracker, parse_speed(options.speed), options.max_gap)
+    finally:
+        tracker.close()
+        await fake.close()
+
+    recorded = sum(min(max(b['ts'] - a['ts'], 0), options.max_gap) for a, b in zip(timed, timed[1:]))
+    print(f"{'dispatch':<28} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for event, samples in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        p50, p99 = percentiles(samples)
+        print(f"{event:<28} {len(samples):>7} {p50:>8.1f} {p99:>8.1f}")
+    lag50, lag99 = percentiles(lags)
+    print(f"{len(timed)} dispatch(es) in {elapsed:.2f}s ({len(timed) / elapsed if elapsed else 0:.1f}/s; recorded span {recorded:.2f}s); "
+          f"behind schedule {len(lags)} time(s), p50 {lag50:.1f} ms, p99 {lag99:.1f} ms")
+    print(f"REST: {sum(fake.calls.values())} call(s), {sum(fake.throttled.values())} 429(s)")
+    if options.routes:
+        for route, count in sorted(fake.calls.items(), key=lambda item: -item[1]):
+            print(f"    {count:>6}  {route}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a gateway recording into the bot against a fake REST API.')
+    parser.add_argument('recording', help='A .jsonl.gz file written by main.py --record-gateway')
+    parser.add_argument('--speed', default='1', help='Replay speed: 1, 10, any multiplier, or "max"')
+    parser.add_argument('--max-gap', type=float, default=5.0, help='Longest pause (in recorded seconds) kept between dispatches')
+    parser.add_argument('--window-scale', type=float, default=1.0, help='Multiplier for every rate-limit window (1 = Discord pacing)')
+    parser.add_argument('--shared-429-rate', type=float, default=0.0, help='Chance of a shared-scope 429 on any request')
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to every REST response')
+    parser.add_argument('--routes', action='store_true', help='Break REST calls down by route')
+    options, _ = parser.parse_known_args()
+    if options.speed != 'max':
+        try:
+            float(options.speed)
+        except ValueError:
+            sys.exit(f"--speed must be a number or 'max', not {options.speed!r}")
+    asyncio.run(run(options))